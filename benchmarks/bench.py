@@ -0,0 +1,295 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import argparse
+import compileall
+import io
+import json
+import random
+import subprocess
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from unittest.mock import patch
+
+LEVELS = ['DEBUG', 'INFO', 'INFO', 'INFO', 'WARN', 'ERROR']
+MODULES = ['parser', 'executor', 'grep', 'wc', 'cat', 'env', 'jobs']
+WORDS = 'lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor'.split()
+BLOCK_SIZE = 1 << 20
+SRC = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src'))
+INTERPRETER = os.path.join(SRC, 'interpreter.py')
+STARTUP_LINES = {'startup': 'echo hi', 'startup-external': 'true'}
+
+Case = Tuple[Callable[[], object], int]
+
+
+def parse_size(text: str) -> int:
+    units = {'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30}
+    text = text.strip().upper()
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+def format_size(size: int) -> str:
+    for unit, scale in (('G', 1 << 30), ('M', 1 << 20), ('K', 1 << 10)):
+        if size >= scale and size % scale == 0:
+            return f"{size // scale}{unit}"
+    return str(size)
+
+
+def log_file(workdir: str, size: int) -> str:
+    path = os.path.join(workdir, f"log-{format_size(size)}.txt")
+    if os.path.exists(path) and os.path.getsize(path) == size:
+        return path
+    rng = random.Random(size)
+    lines = []
+    length = 0
+    while length < BLOCK_SIZE:
+        line = (f"2025-01-{rng.randint(1, 28):02d} {rng.randint(0, 23):02d}:{rng.randint(0, 59):02d} "
+                f"{rng.choice(LEVELS)} [{rng.choice(MODULES)}] "
+                + ' '.join(rng.choice(WORDS) for _ in range(rng.randint(3, 15))) + '\n')
+        lines.append(line)
+        length += len(line)
+    block = ''.join(lines).encode()
+    with open(path, 'wb') as f:
+        written = 0
+        while written < size:
+            chunk = block[:size - written]
+            f.write(chunk)
+            written += len(chunk)
+    return path
+
+
+def shell():
+    from environment_manager import EnvironmentManager
+    from process_manager import ProcessManager
+    from command_parser import CommandParser
+    env = EnvironmentManager()
+    process_manager = ProcessManager(env)
+    return process_manager, CommandParser(env, process_manager)
+
+
+def run_builtin(line: str) -> Case:
+    process_manager, parser = shell()
+    command = parser.parse(line)
+    return (lambda: process_manager.execute_builtin_stream(
+        command, None, io.BytesIO(), io.StringIO())), 0
+
+
+def run_line(line: str) -> Callable[[], object]:
+    process_manager, parser = shell()
+    command = parser.parse(line)
+    return lambda: process_manager.execute(command)
+
+
+def case_parse(workdir: str, size: int) -> Case:
+    from command_parser import parse_tree
+    line = 'echo ' + ('lorem ipsum "dolor $SIT" amet ' * (size // 31 + 1))[:size]
+    return (lambda: parse_tree.__wrapped__(line)), len(line)
+
+
+def case_expand(workdir: str, size: int) -> Case:
+    from command_parser import parse_tree
+    _, parser = shell()
+    tree = parse_tree('echo ' + ' '.join(f'"$HOME/{i}"' for i in range(size // 12)))
+    return (lambda: parser.expand(tree)), size
+
+
+def case_wc(workdir: str, size: int) -> Case:
+    path = log_file(workdir, size)
+    run, _ = run_builtin(f'wc {path}')
+    return run, size
+
+
+def case_grep(workdir: str, size: int) -> Case:
+    path = log_file(workdir, size)
+    run, _ = run_builtin(f'grep -c ERROR {path}')
+    return run, size
+
+
+def case_grep_regex(workdir: str, size: int) -> Case:
+    path = log_file(workdir, size)
+    run, _ = run_builtin(f'grep -c -i "error.*(sed|elit)" {path}')
+    return run, size
+
+
+def case_cat(workdir: str, size: int) -> Case:
+    path = log_file(workdir, size)
+    return run_line(f'cat {path} > {os.devnull}'), size
+
+
+def case_pipeline(workdir: str, size: int, depth: int = 8) -> Case:
+    path = log_file(workdir, size)
+    stages = ' | '.join(['grep -v zzz'] * depth)
+    process_manager, parser = shell()
+    command = parser.parse(f'cat {path} | {stages} | wc -l')
+    return (lambda: process_manager.execute_capture(command)), size
+
+
+def case_script(workdir: str, size: int) -> Case:
+    from interpreter import Interpreter
+    lines = [f'echo line {i} | wc -c\n' for i in range(size // 1024)]
+
+    def run():
+        with open(os.devnull, 'w') as devnull, patch('sys.stdout', new=devnull):
+            Interpreter().run_script(lines)
+
+    return run, sum(map(len, lines))
+
+
+def case_startup(workdir: str, size: int, name: str = 'startup') -> Case:
+    compileall.compile_dir(SRC, quiet=1)
+    argv = [sys.executable, INTERPRETER, '-c', STARTUP_LINES[name]]
+    return (lambda: subprocess.run(argv, stdout=subprocess.DEVNULL, check=True)), 0
+
+
+def case_startup_external(workdir: str, size: int) -> Case:
+    return case_startup(workdir, size, 'startup-external')
+
+
+CASES: Dict[str, Callable[[str, int], Case]] = {
+    'parse': case_parse,
+    'expand': case_expand,
+    'wc': case_wc,
+    'grep': case_grep,
+    'grep-regex': case_grep_regex,
+    'cat': case_cat,
+    'pipeline': case_pipeline,
+    'script': case_script,
+    'startup': case_startup,
+    'startup-external': case_startup_external,
+}
+FIXED_SIZES = {'parse': 1 << 20, 'expand': 1 << 20, 'script': 1 << 20,
+               'startup': 0, 'startup-external': 0}
+
+
+def peak_rss_kb() -> Optional[int]:
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def run_case(name: str, size: int, repeat: int, workdir: str) -> dict:
+    run, nbytes = CASES[name](workdir, size)
+    run()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return {'name': name, 'size': size, 'bytes': nbytes, 'times': times, 'rss_kb': peak_rss_kb()}
+
+
+def percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(q * (len(values) - 1))))
+    return values[index]
+
+
+def summarize(result: dict) -> dict:
+    times = result['times']
+    median = percentile(times, 0.5)
+    return {
+        'key': f"{result['name']}/{format_size(result['size'])}",
+        'p50_ms': median * 1000,
+        'p90_ms': percentile(times, 0.9) * 1000,
+        'p99_ms': percentile(times, 0.99) * 1000,
+        'mb_per_s': result['bytes'] / median / 1e6 if result['bytes'] else None,
+        'rss_mb': result['rss_kb'] / 1024 if result['rss_kb'] is not None else None,
+    }
+
+
+def compare(results: List[dict], baseline: Dict[str, dict], threshold: float) -> List[str]:
+    regressions = []
+    for result in results:
+        base = baseline.get(result['key'])
+        if base is None:
+            continue
+        ratio = result['p50_ms'] / base['p50_ms']
+        if ratio > 1 + threshold:
+            regressions.append(f"{result['key']}: p50 {base['p50_ms']:.2f} -> "
+                               f"{result['p50_ms']:.2f} ms ({(ratio - 1) * 100:+.0f}%)")
+    return regressions
+
+
+def import_report(line: str, top: int = 20) -> List[str]:
+    proc = subprocess.run([sys.executable, '-X', 'importtime', INTERPRETER, '-c', line],
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True)
+    rows = []
+    for text in proc.stderr.splitlines():
+        if not text.startswith('import time:') or 'self [us]' in text:
+            continue
+        self_field, cumulative_field, name = text[len('import time:'):].split('|')
+        rows.append((int(self_field), int(cumulative_field), name.strip()))
+    total = sum(row[0] for row in rows)
+    lines = [f"{len(rows)} modules imported in {total / 1000:.2f} ms by -c {line!r}",
+             f"{'module':<30}{'self ms':>10}{'cum ms':>10}"]
+    for self_us, cumulative_us, name in sorted(rows, reverse=True)[:top]:
+        lines.append(f"{name:<30}{self_us / 1000:>10.2f}{cumulative_us / 1000:>10.2f}")
+    return lines
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Interpreter benchmark suite')
+    parser.add_argument('--cases', default=','.join(CASES), help='comma-separated case names')
+    parser.add_argument('--sizes', default='1M,16M', help='input sizes, e.g. 1M,256M,2G')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--workdir', help='directory for generated inputs (kept between runs)')
+    parser.add_argument('--save', help='write results as a JSON baseline')
+    parser.add_argument('--baseline', help='compare with a saved JSON baseline')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='allowed p50 slowdown against the baseline (0.2 = 20%%)')
+    parser.add_argument('--importtime', action='store_true',
+                        help='print the modules imported at startup, slowest first, and exit')
+    parser.add_argument('--case', help=argparse.SUPPRESS)
+    parser.add_argument('--size', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        print(json.dumps(run_case(args.case, args.size, args.repeat, args.workdir)))
+        return 0
+    if args.importtime:
+        for line in STARTUP_LINES.values():
+            print('\n'.join(import_report(line)))
+        return 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = args.workdir or tmp
+        os.makedirs(workdir, exist_ok=True)
+        results = []
+        print(f"{'case':<20}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'MB/s':>10}{'RSS MB':>10}")
+        for name in args.cases.split(','):
+            sizes = [FIXED_SIZES[name]] if name in FIXED_SIZES else \
+                [parse_size(size) for size in args.sizes.split(',')]
+            for size in sizes:
+                proc = subprocess.run(
+                    [sys.executable, __file__, '--case', name, '--size', str(size),
+                     '--repeat', str(args.repeat), '--workdir', workdir],
+                    stdout=subprocess.PIPE, check=True)
+                result = summarize(json.loads(proc.stdout))
+                results.append(result)
+                throughput = f"{result['mb_per_s']:.1f}" if result['mb_per_s'] else '-'
+                rss = f"{result['rss_mb']:.1f}" if result['rss_mb'] is not None else '-'
+                print(f"{result['key']:<20}{result['p50_ms']:>10.2f}{result['p90_ms']:>10.2f}"
+                      f"{result['p99_ms']:>10.2f}{throughput:>10}{rss:>10}", flush=True)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({result['key']: result for result in results}, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,37 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import argparse
+import timeit
+from command_parser import parse_tree
+
+
+def cases(size: int):
+    text = ('lorem ipsum dolor sit amet ' * (size // 27 + 1))[:size]
+    return {
+        'unquoted': f'echo {text}',
+        'double-quoted': f'echo "{text}"',
+        'single-quoted': f"echo '{text}'",
+        'variables': 'echo ' + ' '.join(f'$VAR{i % 10}' for i in range(size // 6)),
+        'pipeline': ' | '.join(f'grep word{i}' for i in range(size // 14)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='CommandParser throughput')
+    parser.add_argument('--size', type=int, default=100 * 1024, help='line length in bytes')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    uncached = parse_tree.__wrapped__
+    print(f"{'case':<16}{'MB/s':>10}{'cached us':>12}")
+    for name, line in cases(args.size).items():
+        best = min(timeit.repeat(lambda: uncached(line), number=1, repeat=args.repeat))
+        parse_tree(line)
+        cached = min(timeit.repeat(lambda: parse_tree(line), number=1000, repeat=args.repeat))
+        print(f"{name:<16}{len(line) / best / 1e6:>10.1f}{cached * 1000:>12.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+import asyncio
+import io
+import os
+import sys
+import threading
+from typing import Awaitable, Callable, List, Optional, TextIO, Tuple, Union
+from builtin_registry import CHUNK_SIZE
+from command import Command, CommandType, Pipeline, StageFlag, as_pipeline
+from environment_manager import EnvironmentManager
+from pipeline_executor import Sink, Stage, TextSink, feed_pipe, pipeline_status
+from redirection import child_fds
+from process_manager import ProcessManager
+
+
+class AsyncProcessManager:
+    def __init__(self, env: EnvironmentManager, process_manager: Optional[ProcessManager] = None):
+        self.env = env
+        self.process_manager = process_manager or ProcessManager(env)
+
+    async def execute(self, command: Union[Command, Pipeline]) -> int:
+        if isinstance(command, Command) and command.type == CommandType.ASSIGNMENT:
+            self.process_manager.execute(command)
+            return 0
+        pm = self.process_manager
+        sink = TextSink(sys.stdout, pm.encoding, pm.errors)
+        try:
+            return await self.run_pipeline(as_pipeline(command), sink.write)
+        finally:
+            sink.close()
+
+    async def execute_capture(self, command: Union[Command, Pipeline],
+                              stdin_data: Optional[Union[str, bytes]] = None) -> Tuple[str, str, int]:
+        if isinstance(command, Command) and command.type == CommandType.ASSIGNMENT:
+            self.process_manager.execute(command)
+            return ("", "", 0)
+        stdout_buf = io.BytesIO()
+        stderr_buf = io.StringIO()
+        exit_code = await self.run_pipeline(
+            as_pipeline(command), stdout_buf.write, stderr_buf, stdin_data)
+        return (self.process_manager.decode(stdout_buf.getvalue()), stderr_buf.getvalue(), exit_code)
+
+    async def run_pipeline(self, pipeline: Pipeline, sink: Sink,
+                           stderr: Optional[TextIO] = None,
+                           stdin_data: Optional[Union[str, bytes]] = None) -> int:
+        err = stderr if stderr is not None else sys.stderr
+        stages: List[Awaitable[int]] = []
+        stdin_fd: Optional[int] = None
+
+        if stdin_data is not None:
+            data = (self.process_manager.encode(stdin_data)
+                    if isinstance(stdin_data, str) else stdin_data)
+            stdin_fd, feed_fd = os.pipe()
+            stages.append(self._in_thread(lambda: feed_pipe(feed_fd, data)))
+
+        for command, flags in zip(pipeline.commands, pipeline.flags):
+            read_fd, write_fd = os.pipe()
+            if flags & StageFlag.BUILTIN:
+                stages.append(self._run_builtin(command, stdin_fd, write_fd, err))
+            else:
+                stages.append(await self._start_external(command, stdin_fd, write_fd, err))
+            stdin_fd = read_fd
+
+        assert stdin_fd is not None
+        await self._drain(stdin_fd, sink)
+        return pipeline_status(list(await asyncio.gather(*stages)))
+
+    def _run_builtin(self, command: Command, stdin_fd: Optional[int], stdout_fd: int,
+                     err: TextIO) -> Awaitable[int]:
+        stage = Stage(command)
+
+        def run() -> int:
+            self.process_manager.pipeline_executor.run_builtin(stage, stdin_fd, stdout_fd, err)
+            return stage.code
+
+        return self._in_thread(run)
+
+    @staticmethod
+    def _in_thread(target: Callable[[], int]) -> Awaitable[int]:
+        # Every stage gets its own thread: stages block on each other's pipes,
+        # so running them on a bounded executor can leave a reader unstarted.
+        loop = asyncio.get_running_loop()
+        future: 'asyncio.Future[int]' = loop.create_future()
+
+        def run() -> None:
+            try:
+                result = target()
+            except BaseException as e:
+                loop.call_soon_threadsafe(future.set_exception, e)
+            else:
+                loop.call_soon_threadsafe(future.set_result, result)
+
+        threading.Thread(target=run, daemon=True).start()
+        return future
+
+    async def _start_external(self, command: Command, stdin_fd: Optional[int], stdout_fd: int,
+                              err: TextIO) -> Awaitable[int]:
+        command_hash = self.process_manager.command_hash
+        executable = command_hash.lookup(command.name)
+        opened: List[int] = []
+        try:
+            if executable is None:
+                raise FileNotFoundError(command.name)
+            fds = [stdin_fd, stdout_fd, asyncio.subprocess.PIPE]
+            opened = child_fds(command.redirects, fds)
+            process = await asyncio.create_subprocess_exec(
+                command.name, *command.args,
+                executable=executable,
+                stdin=fds[0],
+                stdout=fds[1],
+                stderr=fds[2],
+                env=self.env.get_environment()
+            )
+        except FileNotFoundError:
+            command_hash.forget(command.name)
+            print(f"{command.name}: command not found", file=err)
+            return self._exit_code(127)
+        except PermissionError:
+            print(f"{command.name}: permission denied", file=err)
+            return self._exit_code(126)
+        except ValueError as e:
+            print(e, file=err)
+            return self._exit_code(1)
+        finally:
+            os.close(stdout_fd)
+            if stdin_fd is not None:
+                os.close(stdin_fd)
+            for fd in opened:
+                os.close(fd)
+        # Started right away: the child's stderr has to be read while the
+        # pipeline output is drained, or a chatty child blocks on it.
+        return asyncio.create_task(self._wait_external(process, err))
+
+    @staticmethod
+    async def _exit_code(code: int) -> int:
+        return code
+
+    @staticmethod
+    async def _wait_external(process: asyncio.subprocess.Process, err: TextIO) -> int:
+        if process.stderr is not None:
+            sink = TextSink(err)
+            while True:
+                chunk = await process.stderr.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                sink.write(chunk)
+            sink.close()
+        return await process.wait()
+
+    @staticmethod
+    async def _drain(fd: int, sink: Sink) -> None:
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader(limit=CHUNK_SIZE)
+        transport, _ = await loop.connect_read_pipe(
+            lambda: asyncio.StreamReaderProtocol(reader), open(fd, 'rb', buffering=0))
+        try:
+            while True:
+                chunk = await reader.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                sink(chunk)
+        finally:
+            transport.close()
@@ -0,0 +1,79 @@
+import errno
+import os
+from typing import BinaryIO, Iterator, List, Optional, TextIO
+from builtin_registry import BuiltinCommand, ChunkStream
+from pipeline_executor import stream_fileno
+
+COPY_SIZE = 1 << 30
+FALLBACK_ERRORS = (errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP, errno.EBADF)
+
+
+class Cat(BuiltinCommand):
+    name = 'cat'
+
+    def run(self, args: List[str], stdin: Optional[BinaryIO], stdout: BinaryIO, stderr: TextIO) -> int:
+        out_fd = stream_fileno(stdout)
+        if out_fd is not None:
+            stdout.flush()
+        code = 0
+        for path in args or ['-']:
+            try:
+                if path == '-':
+                    if stdin is None:
+                        print("cat: no input source", file=stderr)
+                        code = 1
+                        continue
+                    self._copy(stdin, stdout, out_fd, os.splice if hasattr(os, 'splice') else None)
+                else:
+                    with open(path, 'rb') as f:
+                        self._copy(f, stdout, out_fd,
+                                   self._sendfile if hasattr(os, 'sendfile') else None)
+            except OSError as e:
+                if isinstance(e, BrokenPipeError):
+                    raise
+                print(f"cat: {e}", file=stderr)
+                code = 1
+        return code
+
+    def streams(self, args: List[str]) -> bool:
+        return True
+
+    def stream(self, args: List[str], chunks: Optional[Iterator[bytes]], stderr: TextIO) -> ChunkStream:
+        code = 0
+        for path in args or ['-']:
+            if path == '-':
+                if chunks is None:
+                    print("cat: no input source", file=stderr)
+                    code = 1
+                    continue
+                yield from chunks
+                continue
+            try:
+                f = open(path, 'rb')
+            except OSError as e:
+                print(f"cat: {e}", file=stderr)
+                code = 1
+                continue
+            with f:
+                yield from self.read_chunks(f)
+        return code
+
+    def _copy(self, src: BinaryIO, stdout: BinaryIO, out_fd: Optional[int], copy_fd) -> None:
+        in_fd = stream_fileno(src)
+        if out_fd is not None and in_fd is not None and copy_fd is not None:
+            copied = 0
+            try:
+                while True:
+                    n = copy_fd(in_fd, out_fd, COPY_SIZE)
+                    if not n:
+                        return
+                    copied += n
+            except OSError as e:
+                if copied or e.errno not in FALLBACK_ERRORS:
+                    raise
+        for chunk in self.read_chunks(src):
+            stdout.write(chunk)
+
+    @staticmethod
+    def _sendfile(in_fd: int, out_fd: int, count: int) -> int:
+        return os.sendfile(out_fd, in_fd, None, count)
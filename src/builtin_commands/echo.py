@@ -0,0 +1,18 @@
+from typing import BinaryIO, Iterator, List, Optional, TextIO
+from builtin_registry import BuiltinCommand, ChunkStream
+
+
+class Echo(BuiltinCommand):
+    name = 'echo'
+    pure = True
+
+    def run(self, args: List[str], stdin: Optional[BinaryIO], stdout: BinaryIO, stderr: TextIO) -> int:
+        stdout.write(self.process_manager.encode(' '.join(args) + '\n'))
+        return 0
+
+    def streams(self, args: List[str]) -> bool:
+        return True
+
+    def stream(self, args: List[str], chunks: Optional[Iterator[bytes]], stderr: TextIO) -> ChunkStream:
+        yield self.process_manager.encode(' '.join(args) + '\n')
+        return 0
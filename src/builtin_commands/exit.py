@@ -0,0 +1,9 @@
+from typing import BinaryIO, List, Optional, TextIO
+from builtin_registry import BuiltinCommand
+
+
+class Exit(BuiltinCommand):
+    name = 'exit'
+
+    def run(self, args: List[str], stdin: Optional[BinaryIO], stdout: BinaryIO, stderr: TextIO) -> int:
+        return self.process_manager.FINISH
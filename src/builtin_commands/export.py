@@ -0,0 +1,25 @@
+import shlex
+from typing import BinaryIO, List, Optional, TextIO
+from builtin_registry import BuiltinCommand
+
+
+class Export(BuiltinCommand):
+    name = 'export'
+
+    def run(self, args: List[str], stdin: Optional[BinaryIO], stdout: BinaryIO, stderr: TextIO) -> int:
+        env = self.process_manager.env
+        if not args:
+            environment = env.get_environment()
+            lines = [f"export {name}={shlex.quote(environment[name])}\n" for name in sorted(environment)]
+            stdout.write(''.join(lines).encode(errors='surrogateescape'))
+            return 0
+
+        code = 0
+        for arg in args:
+            name, sep, value = arg.partition('=')
+            try:
+                env.export(name, value if sep else None)
+            except ValueError:
+                print(f"export: `{arg}': not a valid identifier", file=stderr)
+                code = 1
+        return code
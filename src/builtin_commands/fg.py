@@ -0,0 +1,19 @@
+from typing import BinaryIO, List, Optional, TextIO
+from builtin_registry import BuiltinCommand
+
+
+class Fg(BuiltinCommand):
+    name = 'fg'
+
+    def run(self, args: List[str], stdin: Optional[BinaryIO], stdout: BinaryIO, stderr: TextIO) -> int:
+        table = self.process_manager.jobs
+        job = table.find(args[0]) if args else table.get()
+        if job is None:
+            print(f"fg: {args[0]}: no such job" if args else "fg: no current job", file=stderr)
+            return 1
+        # Like the shell, fg echoes the command without the trailing "&".
+        text = job.text[:-2] if job.text.endswith(' &') else job.text
+        stdout.write(f"{text}\n".encode())
+        code = job.wait()
+        table.remove(job)
+        return code
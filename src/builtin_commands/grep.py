@@ -0,0 +1,562 @@
+import os
+import re
+import functools
+from dataclasses import dataclass
+from typing import Any, BinaryIO, Iterable, Iterator, List, Optional, Pattern, TextIO, Tuple
+from builtin_registry import BuiltinCommand, ChunkBuffer, ChunkStream
+from parallel import parse_jobs, process_pool
+
+READ_SIZE = 1024 * 1024
+MATCHER_CACHE_SIZE = 128
+RANGE_SIZE = 32 * 1024 * 1024
+STDIN_LABEL = '(standard input)'
+REGEX_METACHARS = frozenset('.^$*+?{}[]\\|()')
+# With these constructs a match found in a multi-line buffer may differ from
+# a match on the line alone, so such patterns are matched line by line.
+LINE_ONLY = ('(?', '\\A', '\\Z', '\\n', '\n')
+
+
+@dataclass
+class GrepOptions:
+    pattern: str = ''
+    ignore_case: bool = False
+    word: bool = False
+    invert: bool = False
+    count: bool = False
+    files_with_matches: bool = False
+    line_number: bool = False
+    recursive: bool = False
+    max_count: Optional[int] = None
+    after_context: int = 0
+    jobs: Optional[int] = None
+
+    def splits_ranges(self) -> bool:
+        # Line numbers, context and -m depend on everything before a line,
+        # so only files searched without them are cut into byte ranges.
+        return not (self.line_number or self.after_context or self.max_count is not None)
+
+
+def required_literal(pattern: str) -> str:
+    # The longest run of plain characters every match has to contain;
+    # alternations and groups may skip any part, so they get no prefilter.
+    if '|' in pattern or '(' in pattern:
+        return ''
+    best = ''
+    run: List[str] = []
+    size = len(pattern)
+    i = 0
+    while i < size:
+        c = pattern[i]
+        step = 1
+        if c == '\\':
+            if i + 1 >= size or pattern[i+1] not in REGEX_METACHARS:
+                best = max(best, ''.join(run), key=len)
+                run = []
+                i += 2
+                continue
+            c = pattern[i+1]
+            step = 2
+        elif c == '[':
+            best = max(best, ''.join(run), key=len)
+            run = []
+            j = i + 1
+            if j < size and pattern[j] == '^':
+                j += 1
+            if j < size and pattern[j] == ']':
+                j += 1
+            j = pattern.find(']', j)
+            if j < 0:
+                return ''
+            i = j + 1
+            continue
+        elif c == '{':
+            # A {m,n} quantifier; its digits are not part of the text.
+            best = max(best, ''.join(run), key=len)
+            run = []
+            j = pattern.find('}', i + 1)
+            i = j + 1 if j >= 0 else i + 1
+            continue
+        elif c in REGEX_METACHARS:
+            best = max(best, ''.join(run), key=len)
+            run = []
+            i += 1
+            continue
+        following = pattern[i+step:i+step+1]
+        if following in ('*', '?', '{'):
+            best = max(best, ''.join(run), key=len)
+            run = []
+        else:
+            run.append(c)
+            if following == '+':
+                best = max(best, ''.join(run), key=len)
+                run = []
+        i += step
+    return max(best, ''.join(run), key=len)
+
+
+class Matcher:
+    def __init__(self, pattern: str, ignore_case: bool = False, word: bool = False):
+        flags = re.MULTILINE | (re.IGNORECASE if ignore_case else 0)
+        regex_pattern = r'\b(?:{})\b'.format(pattern) if word else pattern
+        self.text_regex = re.compile(regex_pattern, flags)
+        self.bytes_regex: Optional[Pattern[bytes]] = None
+        if regex_pattern.isascii():
+            try:
+                self.bytes_regex = re.compile(regex_pattern.encode(), flags)
+            except re.error:
+                pass
+        self.whole_buffer = not any(token in pattern for token in LINE_ONLY)
+        self.literal: Optional[bytes] = None
+        self.ignore_case = ignore_case
+        if (not word and pattern and '\n' not in pattern
+                and not REGEX_METACHARS.intersection(pattern)
+                and (not ignore_case or pattern.isascii())):
+            self.literal = (pattern.lower() if ignore_case else pattern).encode()
+        self.prefilter = '' if ignore_case or self.literal else required_literal(pattern)
+        self.bytes_prefilter = self.prefilter.encode()
+
+    def prepare(self, buf: bytes) -> Any:
+        # ASCII data reads the same through a bytes or a str regex, so only
+        # buffers with non-ASCII bytes (or non-ASCII patterns) pay for decoding.
+        if self.literal is not None or (self.bytes_regex is not None and buf.isascii()):
+            return buf
+        return buf.decode('utf-8', 'surrogateescape')
+
+    def lines(self, data: Any) -> Iterator[Tuple[int, int]]:
+        if isinstance(data, bytes):
+            if self.literal is not None:
+                return self._scan_literal(data.lower() if self.ignore_case else data)
+            regex: Any = self.bytes_regex
+            nl: Any = b'\n'
+            prefilter: Any = self.bytes_prefilter
+        else:
+            regex = self.text_regex
+            nl = '\n'
+            prefilter = self.prefilter
+        if prefilter and prefilter not in data:
+            return iter(())
+        if self.whole_buffer:
+            return self._scan_buffer(regex, data, nl)
+        return self._scan_lines(regex, data, nl)
+
+    def _scan_literal(self, data: bytes) -> Iterator[Tuple[int, int]]:
+        literal = self.literal
+        assert literal is not None
+        size = len(data)
+        pos = 0
+        while pos < size:
+            found = data.find(literal, pos)
+            if found < 0:
+                return
+            start = data.rfind(b'\n', pos, found) + 1 or pos
+            end = data.find(b'\n', found) + 1
+            yield start, end
+            pos = end
+
+    @staticmethod
+    def _scan_buffer(regex, data: Any, nl: Any) -> Iterator[Tuple[int, int]]:
+        size = len(data)
+        pos = 0
+        while pos < size:
+            m = regex.search(data, pos)
+            if m is None or m.start() >= size:
+                return
+            start = data.rfind(nl, pos, m.start()) + 1 or pos
+            end = data.find(nl, m.start()) + 1
+            if m.end() < end or regex.search(data[start:end - 1]):
+                yield start, end
+            pos = end
+
+    @staticmethod
+    def _scan_lines(regex, data: Any, nl: Any) -> Iterator[Tuple[int, int]]:
+        size = len(data)
+        start = 0
+        while start < size:
+            end = data.find(nl, start) + 1
+            if regex.search(data[start:end - 1]):
+                yield start, end
+            start = end
+
+
+@functools.lru_cache(maxsize=MATCHER_CACHE_SIZE)
+def get_matcher(pattern: str, ignore_case: bool = False, word: bool = False) -> Matcher:
+    return Matcher(pattern, ignore_case, word)
+
+
+def matcher_cache_info():
+    return get_matcher.cache_info()
+
+
+class GrepEngine:
+    def __init__(self, options: GrepOptions, matcher: Matcher, stdout: BinaryIO, show_names: bool):
+        self.options = options
+        self.matcher = matcher
+        self.stdout = stdout
+        self.show_names = show_names
+
+    def search(self, source: BinaryIO, label: str) -> int:
+        selected = self.scan(source, label)
+        self.summary(label, selected)
+        return selected
+
+    def summary(self, label: str, selected: int) -> None:
+        if self.options.files_with_matches:
+            if selected:
+                self.stdout.write(f"{label}\n".encode())
+        elif self.options.count:
+            prefix = f"{label}:" if self.show_names else ''
+            self.stdout.write(f"{prefix}{selected}\n".encode())
+
+    def scan(self, source: BinaryIO, label: str) -> int:
+        read = getattr(source, 'read1', source.read)
+        for _ in self.scan_chunks(iter(functools.partial(read, READ_SIZE), b''), label):
+            pass
+        return self.selected
+
+    def scan_chunks(self, chunks: Iterable[bytes], label: str) -> Iterator[None]:
+        # Yields after every buffer of whole lines, so that a caller can pass
+        # on what was written to self.stdout before reading further.
+        self.label = label
+        self.selected = 0
+        self.lineno = 1
+        self.context_left = 0
+        self.stopping = False
+        tail = b''
+
+        for chunk in chunks:
+            buf = tail + chunk if tail else chunk
+            cut = buf.rfind(b'\n') + 1
+            if not cut:
+                tail = buf
+                continue
+            buf, tail = buf[:cut], buf[cut:]
+            if not self._scan(buf):
+                return
+            yield
+        if tail:
+            self._scan(tail + b'\n')
+            yield
+
+    def _scan(self, buf: bytes) -> bool:
+        options = self.options
+        data = self.matcher.prepare(buf)
+        nl: Any = b'\n' if isinstance(data, bytes) else '\n'
+        out: List[Any] = []
+        self.counted = 0
+        ctx = 0
+
+        if self.stopping:
+            self._context(out, data, nl, 0, len(data))
+            self._flush(out, data)
+            self._line_at(data, nl, len(data))
+            return self.context_left > 0
+
+        quiet = options.count or options.files_with_matches
+        for start, end in self._runs(data, nl):
+            if self.context_left and not quiet:
+                self._context(out, data, nl, ctx, start)
+            lines = data.count(nl, start, end)
+            if options.max_count is not None:
+                allowed = options.max_count - self.selected
+                if lines >= allowed:
+                    self.stopping = True
+                    if lines > allowed:
+                        end = self._skip_lines(data, nl, start, allowed)
+                        lines = allowed
+            self.selected += lines
+            if options.files_with_matches:
+                return False
+            if not quiet:
+                self._emit(out, data, nl, start, end, ':')
+            ctx = end
+            if lines:
+                self.context_left = options.after_context
+            if self.stopping:
+                break
+
+        if self.context_left and not quiet:
+            self._context(out, data, nl, ctx, len(data))
+        self._flush(out, data)
+        if options.line_number:
+            self._line_at(data, nl, len(data))
+        if self.stopping:
+            return self.context_left > 0 and not quiet
+        return True
+
+    def _runs(self, data: Any, nl: Any) -> Iterator[Tuple[int, int]]:
+        matches = self.matcher.lines(data)
+        if not self.options.invert:
+            return matches
+        return self._gaps(matches, len(data))
+
+    @staticmethod
+    def _gaps(matches: Iterator[Tuple[int, int]], size: int) -> Iterator[Tuple[int, int]]:
+        pos = 0
+        for start, end in matches:
+            if start > pos:
+                yield pos, start
+            pos = end
+        if pos < size:
+            yield pos, size
+
+    @staticmethod
+    def _skip_lines(data: Any, nl: Any, pos: int, lines: int) -> int:
+        for _ in range(lines):
+            pos = data.find(nl, pos) + 1
+        return pos
+
+    def _context(self, out: List[Any], data: Any, nl: Any, start: int, stop: int) -> None:
+        if start >= stop:
+            return
+        lines = data.count(nl, start, stop)
+        if lines > self.context_left:
+            stop = self._skip_lines(data, nl, start, self.context_left)
+            lines = self.context_left
+        self.context_left -= lines
+        self._emit(out, data, nl, start, stop, '-')
+
+    def _line_at(self, data: Any, nl: Any, pos: int) -> int:
+        self.lineno += data.count(nl, self.counted, pos)
+        self.counted = pos
+        return self.lineno
+
+    def _emit(self, out: List[Any], data: Any, nl: Any, start: int, end: int, sep: str) -> None:
+        if not self.show_names and not self.options.line_number:
+            out.append(data[start:end])
+            return
+        name = f"{self.label}{sep}" if self.show_names else ''
+        lineno = self._line_at(data, nl, start)
+        while start < end:
+            line_end = data.find(nl, start) + 1
+            prefix = f"{name}{lineno}{sep}" if self.options.line_number else name
+            out.append(prefix.encode() if isinstance(data, bytes) else prefix)
+            out.append(data[start:line_end])
+            start = line_end
+            lineno += 1
+
+    def _flush(self, out: List[Any], data: Any) -> None:
+        if not out:
+            return
+        if isinstance(data, bytes):
+            self.stdout.write(b''.join(out))
+        else:
+            self.stdout.write(''.join(out).encode('utf-8', 'surrogateescape'))
+
+
+class RangeReader:
+    def __init__(self, f: BinaryIO, start: int, end: int):
+        f.seek(start)
+        self.f = f
+        self.left = end - start
+
+    def read(self, size: int) -> bytes:
+        chunk = self.f.read(min(size, self.left))
+        self.left -= len(chunk)
+        return chunk
+
+
+def search_range(options: GrepOptions, path: str, start: int, end: Optional[int],
+                 show_names: bool) -> Tuple[bytes, int, Optional[str]]:
+    import io
+
+    out = io.BytesIO()
+    engine = GrepEngine(options, get_matcher(options.pattern, options.ignore_case, options.word),
+                        out, show_names)
+    try:
+        with open(path, 'rb') as f:
+            source: Any = f if end is None else RangeReader(f, start, end)
+            selected = engine.scan(source, path)
+    except OSError as e:
+        return out.getvalue(), 0, f"grep: {e}"
+    return out.getvalue(), selected, None
+
+
+class Grep(BuiltinCommand):
+    name = 'grep'
+
+    def run(self, args: List[str], stdin: Optional[BinaryIO], stdout: BinaryIO, stderr: TextIO) -> int:
+        try:
+            options, files = self._parse_args(args)
+        except ValueError as e:
+            print(e, file=stderr)
+            return 1
+        try:
+            matcher = get_matcher(options.pattern, options.ignore_case, options.word)
+        except re.error as e:
+            print(f"grep: invalid regex: {e}", file=stderr)
+            return 1
+
+        if not files:
+            if stdin is None:
+                print("grep: no input source", file=stderr)
+                return 1
+            engine = GrepEngine(options, matcher, stdout, False)
+            return 0 if engine.search(stdin, STDIN_LABEL) else 1
+
+        paths, failed = self._collect_files(files, options.recursive, stderr)
+        engine = GrepEngine(options, matcher, stdout, len(paths) > 1 or options.recursive)
+        if options.jobs is None:
+            options.jobs = parse_jobs(self.process_manager.env.get('GREP_JOBS'))
+        if options.jobs > 1:
+            tasks = self._plan(paths, options)
+            if len(tasks) > 1:
+                selected, pool_failed = self._run_parallel(tasks, options, engine, stderr)
+                return 0 if selected and not failed and not pool_failed else 1
+
+        selected = 0
+        for path in paths:
+            try:
+                with open(path, 'rb') as f:
+                    selected += engine.search(f, path)
+            except OSError as e:
+                if isinstance(e, BrokenPipeError):
+                    raise
+                print(f"grep: {e}", file=stderr)
+                failed = True
+        return 0 if selected and not failed else 1
+
+    def streams(self, args: List[str]) -> bool:
+        try:
+            _, files = self._parse_args(args)
+        except ValueError:
+            return False
+        return not files
+
+    def stream(self, args: List[str], chunks: Optional[Iterator[bytes]], stderr: TextIO) -> ChunkStream:
+        options, _ = self._parse_args(args)
+        try:
+            matcher = get_matcher(options.pattern, options.ignore_case, options.word)
+        except re.error as e:
+            print(f"grep: invalid regex: {e}", file=stderr)
+            return 1
+        if chunks is None:
+            print("grep: no input source", file=stderr)
+            return 1
+        out: Any = ChunkBuffer()
+        engine = GrepEngine(options, matcher, out, False)
+        for _ in engine.scan_chunks(chunks, STDIN_LABEL):
+            if out:
+                yield b''.join(out)
+                out.clear()
+        engine.summary(STDIN_LABEL, engine.selected)
+        yield from out
+        return 0 if engine.selected else 1
+
+    @staticmethod
+    def _plan(paths: List[str], options: GrepOptions) -> List[Tuple[str, int, Optional[int]]]:
+        tasks: List[Tuple[str, int, Optional[int]]] = []
+        for path in paths:
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                size = 0
+            if size <= RANGE_SIZE or not options.splits_ranges():
+                tasks.append((path, 0, None))
+                continue
+            with open(path, 'rb') as f:
+                start = 0
+                while start < size:
+                    f.seek(start + RANGE_SIZE)
+                    f.readline()
+                    end = min(f.tell(), size)
+                    tasks.append((path, start, end))
+                    start = end
+        return tasks
+
+    @staticmethod
+    def _run_parallel(tasks: List[Tuple[str, int, Optional[int]]], options: GrepOptions,
+                      engine: GrepEngine, stderr: TextIO) -> Tuple[int, bool]:
+        assert options.jobs is not None
+        selected = 0
+        failed = False
+        file_selected = 0
+        with process_pool(options.jobs) as pool:
+            futures = [pool.submit(search_range, options, path, start, end, engine.show_names)
+                       for path, start, end in tasks]
+            for i, ((path, _, _), future) in enumerate(zip(tasks, futures)):
+                output, count, error = future.result()
+                if error is not None:
+                    print(error, file=stderr)
+                    failed = True
+                engine.stdout.write(output)
+                file_selected += count
+                if i + 1 == len(tasks) or tasks[i + 1][0] != path:
+                    if error is None:
+                        engine.summary(path, file_selected)
+                    selected += file_selected
+                    file_selected = 0
+        return selected, failed
+
+    @staticmethod
+    def _parse_args(args: List[str]) -> Tuple[GrepOptions, List[str]]:
+        options = GrepOptions()
+        pattern = None
+        files: List[str] = []
+        flags = {'i': 'ignore_case', 'w': 'word', 'v': 'invert', 'c': 'count',
+                 'l': 'files_with_matches', 'n': 'line_number',
+                 'r': 'recursive', 'R': 'recursive'}
+        i = 0
+        only_operands = False
+
+        while i < len(args):
+            arg = args[i]
+            i += 1
+            if only_operands or not arg.startswith('-') or arg == '-':
+                if pattern is None:
+                    pattern = arg
+                else:
+                    files.append(arg)
+                continue
+            if arg == '--':
+                only_operands = True
+                continue
+            for pos, flag in enumerate(arg[1:], 1):
+                if flag in flags:
+                    setattr(options, flags[flag], True)
+                elif flag in 'Ajm':
+                    value = arg[pos + 1:]
+                    if not value:
+                        if i >= len(args):
+                            raise ValueError(f"grep: option requires an argument -- '{flag}'")
+                        value = args[i]
+                        i += 1
+                    try:
+                        number = int(value)
+                    except ValueError:
+                        if flag == 'A':
+                            raise ValueError(f"grep: invalid number of lines after context: '{value}'")
+                        if flag == 'j':
+                            raise ValueError(f"grep: invalid number of jobs: '{value}'")
+                        raise ValueError(f"grep: invalid max count: '{value}'")
+                    if number < 0:
+                        raise ValueError(f"invalid number: {number}")
+                    if flag == 'A':
+                        options.after_context = number
+                    elif flag == 'j':
+                        options.jobs = number or (os.cpu_count() or 1)
+                    else:
+                        options.max_count = number
+                    break
+                else:
+                    raise ValueError(f"Invalid option: {arg}")
+
+        if not pattern:
+            raise ValueError("grep: missing pattern")
+        options.pattern = pattern
+        return options, files
+
+    @staticmethod
+    def _collect_files(files: List[str], recursive: bool, stderr: TextIO) -> Tuple[List[str], bool]:
+        paths = []
+        failed = False
+        for name in files:
+            if not os.path.isdir(name):
+                paths.append(name)
+            elif recursive:
+                for root, dirs, names in os.walk(name):
+                    dirs.sort()
+                    paths.extend(os.path.join(root, n) for n in sorted(names))
+            else:
+                print(f"grep: {name}: Is a directory", file=stderr)
+                failed = True
+        return paths, failed
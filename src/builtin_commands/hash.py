@@ -0,0 +1,30 @@
+from typing import BinaryIO, List, Optional, TextIO
+from builtin_registry import BuiltinCommand
+
+
+class Hash(BuiltinCommand):
+    name = 'hash'
+
+    def run(self, args: List[str], stdin: Optional[BinaryIO], stdout: BinaryIO, stderr: TextIO) -> int:
+        table = self.process_manager.command_hash
+        if not args:
+            return self._list(table, stdout)
+        if args[0] == '-r':
+            table.clear()
+            args = args[1:]
+
+        code = 0
+        for name in args:
+            if table.remember(name) is None:
+                print(f"hash: {name}: not found", file=stderr)
+                code = 1
+        return code
+
+    @staticmethod
+    def _list(table, stdout: BinaryIO) -> int:
+        items = table.items()
+        if not items:
+            return 0
+        lines = ['hits\tcommand'] + [f"{hits:4}\t{path}" for _, path, hits in items]
+        stdout.write(('\n'.join(lines) + '\n').encode())
+        return 0
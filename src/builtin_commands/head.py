@@ -0,0 +1,97 @@
+from typing import BinaryIO, Iterable, Iterator, List, Optional, TextIO, Tuple
+from builtin_registry import BuiltinCommand, ChunkStream
+
+
+def parse_count_args(name: str, args: List[str]) -> Tuple[bool, int, List[str]]:
+    lines = True
+    value = '10'
+    files = []
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg in ('-n', '-c'):
+            if i + 1 >= len(args):
+                raise ValueError(f"{name}: option requires an argument -- '{arg[1]}'")
+            lines, value = arg == '-n', args[i+1]
+            i += 2
+            continue
+        if arg[:2] in ('-n', '-c') and len(arg) > 2:
+            lines, value = arg[1] == 'n', arg[2:]
+        elif arg.startswith('-') and arg[1:].isdigit():
+            lines, value = True, arg[1:]
+        elif arg.startswith('-') and len(arg) > 1:
+            raise ValueError(f"{name}: invalid option -- '{arg[1]}'")
+        else:
+            files.append(arg)
+        i += 1
+    if not value.isdigit():
+        raise ValueError(f"{name}: invalid number of {'lines' if lines else 'bytes'}: '{value}'")
+    return lines, int(value), files
+
+
+def file_header(path: str, first: bool) -> str:
+    return ('' if first else '\n') + f"==> {path} <==\n"
+
+
+def head_chunks(chunks: Iterable[bytes], count: int, lines: bool) -> Iterator[bytes]:
+    left = count
+    if not left:
+        return
+    for chunk in chunks:
+        size = chunk.count(b'\n') if lines else len(chunk)
+        if size < left:
+            yield chunk
+            left -= size
+            continue
+        if not lines:
+            yield chunk[:left]
+            return
+        end = -1
+        for _ in range(left):
+            end = chunk.index(b'\n', end + 1)
+        yield chunk[:end + 1]
+        return
+
+
+class Head(BuiltinCommand):
+    name = 'head'
+
+    def run(self, args: List[str], stdin: Optional[BinaryIO], stdout: BinaryIO, stderr: TextIO) -> int:
+        lines, count, files = parse_count_args('head', args)
+        if not files:
+            if stdin is None:
+                print("head: missing file argument", file=stderr)
+                return 1
+            for chunk in head_chunks(self.read_chunks(stdin), count, lines):
+                stdout.write(chunk)
+            return 0
+
+        code = 0
+        for i, path in enumerate(files):
+            try:
+                f = open(path, 'rb')
+            except OSError as e:
+                print(f"head: {e}", file=stderr)
+                code = 1
+                continue
+            with f:
+                if len(files) > 1:
+                    stdout.write(self.process_manager.encode(file_header(path, i == 0)))
+                for chunk in head_chunks(self.read_chunks(f), count, lines):
+                    stdout.write(chunk)
+        return code
+
+    def streams(self, args: List[str]) -> bool:
+        try:
+            _, _, files = parse_count_args('head', args)
+        except ValueError:
+            return False
+        return not files
+
+    def stream(self, args: List[str], chunks: Optional[Iterator[bytes]], stderr: TextIO) -> ChunkStream:
+        lines, count, _ = parse_count_args('head', args)
+        if chunks is None:
+            print("head: missing file argument", file=stderr)
+            return 1
+        yield from head_chunks(chunks, count, lines)
+        return 0
@@ -0,0 +1,12 @@
+from typing import BinaryIO, List, Optional, TextIO
+from builtin_registry import BuiltinCommand
+
+
+class Jobs(BuiltinCommand):
+    name = 'jobs'
+
+    def run(self, args: List[str], stdin: Optional[BinaryIO], stdout: BinaryIO, stderr: TextIO) -> int:
+        table = self.process_manager.jobs
+        stdout.write(''.join(f"{job}\n" for job in table.jobs()).encode())
+        table.reap()
+        return 0
@@ -0,0 +1,12 @@
+import os
+from typing import BinaryIO, List, Optional, TextIO
+from builtin_registry import BuiltinCommand
+
+
+class Pwd(BuiltinCommand):
+    name = 'pwd'
+    pure = True
+
+    def run(self, args: List[str], stdin: Optional[BinaryIO], stdout: BinaryIO, stderr: TextIO) -> int:
+        stdout.write(os.getcwdb() + b'\n')
+        return 0
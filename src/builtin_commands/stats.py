@@ -0,0 +1,21 @@
+from typing import BinaryIO, List, Optional, TextIO
+from builtin_registry import BuiltinCommand
+
+
+class Stats(BuiltinCommand):
+    name = 'stats'
+
+    def run(self, args: List[str], stdin: Optional[BinaryIO], stdout: BinaryIO, stderr: TextIO) -> int:
+        profiler = self.process_manager.profiler
+        if args and args[0] == '-r':
+            if profiler is not None:
+                profiler.reset()
+            return 0
+        if args:
+            print(f"stats: {args[0]}: invalid option", file=stderr)
+            return 2
+        if profiler is None or not profiler.commands:
+            print("stats: no profiled commands", file=stderr)
+            return 1
+        stdout.write((profiler.summary() + '\n').encode())
+        return 0
@@ -0,0 +1,108 @@
+import io
+import os
+import stat
+from collections import deque
+from typing import BinaryIO, Deque, Iterable, Iterator, List, Optional, TextIO
+from builtin_registry import BuiltinCommand, ChunkStream
+from builtin_commands.head import file_header, parse_count_args
+from pipeline_executor import stream_fileno
+
+BLOCK_SIZE = 64 * 1024
+
+
+def tail_offset(f: BinaryIO, count: int, lines: bool) -> int:
+    end = f.seek(0, os.SEEK_END)
+    if not lines or not count:
+        return max(end - count, 0)
+    pos = end
+    while pos > 0:
+        size = min(BLOCK_SIZE, pos)
+        pos -= size
+        f.seek(pos)
+        block = f.read(size)
+        i = len(block)
+        # The newline that ends the last line does not start another one.
+        if pos + size == end and block.endswith(b'\n'):
+            i -= 1
+        while True:
+            i = block.rfind(b'\n', 0, i)
+            if i < 0:
+                break
+            count -= 1
+            if not count:
+                return pos + i + 1
+    return 0
+
+
+def tail_chunks(chunks: Iterable[bytes], count: int, lines: bool) -> bytes:
+    kept: Deque[bytes] = deque()
+    size = 0
+    # Whole lines need the newline before the first of them kept too.
+    keep = count + 1 if lines else count
+    for chunk in chunks:
+        kept.append(chunk)
+        size += chunk.count(b'\n') if lines else len(chunk)
+        while kept:
+            first = kept[0].count(b'\n') if lines else len(kept[0])
+            if size - first < keep:
+                break
+            kept.popleft()
+            size -= first
+    data = io.BytesIO(b''.join(kept))
+    data.seek(tail_offset(data, count, lines))
+    return data.read()
+
+
+def is_regular(f: BinaryIO) -> bool:
+    fd = stream_fileno(f)
+    return fd is not None and stat.S_ISREG(os.fstat(fd).st_mode)
+
+
+class Tail(BuiltinCommand):
+    name = 'tail'
+
+    def run(self, args: List[str], stdin: Optional[BinaryIO], stdout: BinaryIO, stderr: TextIO) -> int:
+        lines, count, files = parse_count_args('tail', args)
+        if not files:
+            if stdin is None:
+                print("tail: missing file argument", file=stderr)
+                return 1
+            self._tail(stdin, stdout, count, lines)
+            return 0
+
+        code = 0
+        for i, path in enumerate(files):
+            try:
+                f = open(path, 'rb')
+            except OSError as e:
+                print(f"tail: {e}", file=stderr)
+                code = 1
+                continue
+            with f:
+                if len(files) > 1:
+                    stdout.write(self.process_manager.encode(file_header(path, i == 0)))
+                self._tail(f, stdout, count, lines)
+        return code
+
+    def streams(self, args: List[str]) -> bool:
+        try:
+            _, _, files = parse_count_args('tail', args)
+        except ValueError:
+            return False
+        return not files
+
+    def stream(self, args: List[str], chunks: Optional[Iterator[bytes]], stderr: TextIO) -> ChunkStream:
+        lines, count, _ = parse_count_args('tail', args)
+        if chunks is None:
+            print("tail: missing file argument", file=stderr)
+            return 1
+        yield tail_chunks(chunks, count, lines)
+        return 0
+
+    def _tail(self, f: BinaryIO, stdout: BinaryIO, count: int, lines: bool) -> None:
+        if not is_regular(f):
+            stdout.write(tail_chunks(self.read_chunks(f), count, lines))
+            return
+        f.seek(tail_offset(f, count, lines))
+        for chunk in self.read_chunks(f):
+            stdout.write(chunk)
@@ -0,0 +1,25 @@
+from typing import BinaryIO, List, Optional, TextIO
+from builtin_registry import BuiltinCommand
+
+
+class Wait(BuiltinCommand):
+    name = 'wait'
+
+    def run(self, args: List[str], stdin: Optional[BinaryIO], stdout: BinaryIO, stderr: TextIO) -> int:
+        table = self.process_manager.jobs
+        if not args:
+            for job in table.jobs():
+                job.wait()
+                table.remove(job)
+            return 0
+
+        code = 0
+        for spec in args:
+            job = table.find(spec)
+            if job is None:
+                print(f"wait: {spec}: no such job", file=stderr)
+                code = 127
+                continue
+            code = job.wait()
+            table.remove(job)
+        return code
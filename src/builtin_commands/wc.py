@@ -0,0 +1,168 @@
+import os
+from typing import BinaryIO, Iterable, Iterator, List, Optional, TextIO, Tuple
+from builtin_registry import BuiltinCommand, ChunkStream
+
+WINDOW_SIZE = 1024 * 1024
+PARALLEL_THRESHOLD = 64 * 1024 * 1024
+
+# Every whitespace byte (the set bytes.split() uses) becomes b' ' and every
+# other byte b'x', so the words in a chunk are the b' x' transitions.
+WORD_TABLE = bytes(0x20 if bytes([c]).isspace() else 0x78 for c in range(256))
+
+
+class Counts:
+    def __init__(self):
+        self.lines = 0
+        self.words = 0
+        self.bytes = 0
+        self.first_in_word = False
+        self.last_in_word = False
+
+    def feed(self, chunk: bytes, count_words: bool) -> None:
+        self.lines += chunk.count(b'\n')
+        if count_words and chunk:
+            marks = chunk.translate(WORD_TABLE)
+            self.words += marks.count(b' x')
+            starts_word = marks[0] == 0x78
+            if not self.bytes:
+                self.first_in_word = starts_word
+            if starts_word and not self.last_in_word:
+                self.words += 1
+            self.last_in_word = marks[-1] == 0x78
+        self.bytes += len(chunk)
+
+    def add(self, other: 'Counts') -> None:
+        if self.last_in_word and other.first_in_word:
+            self.words -= 1
+        if not self.bytes:
+            self.first_in_word = other.first_in_word
+        if other.bytes:
+            self.last_in_word = other.last_in_word
+        self.lines += other.lines
+        self.words += other.words
+        self.bytes += other.bytes
+
+
+def count_stream(chunks: Iterable[bytes], count_words: bool = True) -> Counts:
+    counts = Counts()
+    for chunk in chunks:
+        counts.feed(chunk, count_words)
+    return counts
+
+
+def count_range(path: str, start: int, end: int, count_words: bool = True) -> Counts:
+    import mmap
+
+    counts = Counts()
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for offset in range(start, end, WINDOW_SIZE):
+            counts.feed(mm[offset:min(offset + WINDOW_SIZE, end)], count_words)
+    return counts
+
+
+class Wc(BuiltinCommand):
+    name = 'wc'
+
+    def run(self, args: List[str], stdin: Optional[BinaryIO], stdout: BinaryIO, stderr: TextIO) -> int:
+        show, jobs, files = self._parse_args(args)
+        if not files and stdin is None:
+            print("wc: missing file argument", file=stderr)
+            return 1
+
+        if not files:
+            assert stdin is not None
+            counts = count_stream(self.read_chunks(stdin), show[1])
+            stdout.write(self._format(counts, show, None))
+            return 0
+
+        code = 0
+        total = Counts()
+        for path in files:
+            try:
+                counts = self._count_file(path, show[1], jobs)
+            except OSError as e:
+                print(f"wc: {e}", file=stderr)
+                code = 1
+                continue
+            total.lines += counts.lines
+            total.words += counts.words
+            total.bytes += counts.bytes
+            stdout.write(self._format(counts, show, path))
+        if len(files) > 1:
+            stdout.write(self._format(total, show, 'total'))
+        return code
+
+    def streams(self, args: List[str]) -> bool:
+        try:
+            _, _, files = self._parse_args(args)
+        except ValueError:
+            return False
+        return not files
+
+    def stream(self, args: List[str], chunks: Optional[Iterator[bytes]], stderr: TextIO) -> ChunkStream:
+        show, _, _ = self._parse_args(args)
+        if chunks is None:
+            print("wc: missing file argument", file=stderr)
+            return 1
+        yield self._format(count_stream(chunks, show[1]), show, None)
+        return 0
+
+    def _parse_args(self, args: List[str]) -> Tuple[Tuple[bool, bool, bool], int, List[str]]:
+        from parallel import parse_jobs
+
+        lines = words = chars = False
+        jobs = parse_jobs(self.process_manager.env.get('WC_JOBS'))
+        files = []
+        i = 0
+        while i < len(args):
+            arg = args[i]
+            if arg == '-j':
+                if i + 1 >= len(args):
+                    raise ValueError("wc: option requires an argument -- 'j'")
+                jobs = parse_jobs(args[i+1])
+                i += 2
+                continue
+            if arg.startswith('-') and len(arg) > 1:
+                for flag in arg[1:]:
+                    if flag == 'l':
+                        lines = True
+                    elif flag == 'w':
+                        words = True
+                    elif flag == 'c':
+                        chars = True
+                    else:
+                        raise ValueError(f"wc: invalid option -- '{flag}'")
+            else:
+                files.append(arg)
+            i += 1
+        if not (lines or words or chars):
+            lines = words = chars = True
+        return (lines, words, chars), jobs, files
+
+    def _count_file(self, path: str, count_words: bool, jobs: int) -> Counts:
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                # Pseudo-files (/proc, pipes) report zero size but may still
+                # have content; they cannot be memory-mapped anyway.
+                return count_stream(self.read_chunks(f), count_words)
+
+        if jobs > 1 and size >= PARALLEL_THRESHOLD:
+            from parallel import process_pool, split_range
+
+            total = Counts()
+            with process_pool(jobs) as pool:
+                futures = [pool.submit(count_range, path, start, end, count_words)
+                           for start, end in split_range(size, jobs)]
+                for future in futures:
+                    total.add(future.result())
+            return total
+        return count_range(path, 0, size, count_words)
+
+    @staticmethod
+    def _format(counts: Counts, show: Tuple[bool, bool, bool], name: Optional[str]) -> bytes:
+        fields = [str(value) for value, shown
+                  in zip((counts.lines, counts.words, counts.bytes), show) if shown]
+        if name is not None:
+            fields.append(name)
+        return (' '.join(fields) + '\n').encode()
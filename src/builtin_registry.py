@@ -0,0 +1,154 @@
+import importlib
+import os
+import sys
+from typing import BinaryIO, Dict, Generator, Iterator, List, Optional, TextIO, Tuple, Type, Union
+
+CHUNK_SIZE = 64 * 1024
+ENTRY_POINT_GROUP = 'sd_cli.builtins'
+
+ChunkStream = Generator[bytes, None, int]
+
+
+class ChunkBuffer(list):
+    def write(self, data: bytes) -> int:
+        self.append(data)
+        return len(data)
+
+
+class BuiltinCommand:
+    name = ''
+    pure = False
+
+    def __init__(self, process_manager):
+        self.process_manager = process_manager
+
+    def run(self,
+            args: List[str],
+            stdin: Optional[BinaryIO],
+            stdout: BinaryIO,
+            stderr: TextIO) -> int:
+        raise NotImplementedError
+
+    # Builtins that can also run as a generator over input chunks override
+    # these two; the pipeline planner fuses adjacent such stages into one
+    # chain that runs on a single thread without pipes between them. The
+    # generator returns the exit status.
+    def streams(self, args: List[str]) -> bool:
+        return False
+
+    def stream(self,
+               args: List[str],
+               chunks: Optional[Iterator[bytes]],
+               stderr: TextIO) -> ChunkStream:
+        raise NotImplementedError
+
+    @staticmethod
+    def read_chunks(stream: BinaryIO) -> Iterator[bytes]:
+        while True:
+            chunk = stream.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+
+class BuiltinRegistry:
+    def __init__(self):
+        self._targets: Dict[str, str] = {}
+        self._handlers: Dict[str, Type[BuiltinCommand]] = {}
+        self._entry_points_loaded = False
+
+    def register(self, name: str, handler: Union[str, Type[BuiltinCommand]]) -> None:
+        if isinstance(handler, str):
+            self._targets[name] = handler
+            self._handlers.pop(name, None)
+        else:
+            self._handlers[name] = handler
+
+    def unregister(self, name: str) -> None:
+        self._targets.pop(name, None)
+        self._handlers.pop(name, None)
+
+    def names(self) -> List[str]:
+        self._load_entry_points()
+        return sorted(set(self._targets) | set(self._handlers))
+
+    def get(self, name: str) -> Optional[Type[BuiltinCommand]]:
+        handler = self._handlers.get(name)
+        if handler is not None:
+            return handler
+        target = self._targets.get(name)
+        if target is None:
+            if self._entry_points_loaded:
+                return None
+            self._load_entry_points()
+            target = self._targets.get(name)
+            if target is None:
+                return None
+        module_name, _, attr = target.partition(':')
+        handler = getattr(importlib.import_module(module_name), attr)
+        self._handlers[name] = handler
+        return handler
+
+    def __contains__(self, name: object) -> bool:
+        if name in self._handlers or name in self._targets:
+            return True
+        if self._entry_points_loaded:
+            return False
+        self._load_entry_points()
+        return name in self._targets
+
+    def _load_entry_points(self) -> None:
+        if self._entry_points_loaded:
+            return
+        self._entry_points_loaded = True
+        for name, target in entry_point_targets(ENTRY_POINT_GROUP):
+            if name not in self._targets and name not in self._handlers:
+                self._targets[name] = target
+
+
+# importlib.metadata costs tens of milliseconds to import, and the registry is
+# consulted for the first external command of every run, so the installed
+# distributions' entry_points.txt files are read directly. Only *.dist-info
+# and *.egg-info directories on sys.path are seen (editable installs have one
+# too); zipped eggs and distributions found through custom path hooks or
+# finders are not, and have to call BUILTINS.register() instead.
+def entry_point_targets(group: str) -> Iterator[Tuple[str, str]]:
+    header = f"[{group}]"
+    for base in sys.path:
+        try:
+            entries = list(os.scandir(base or '.'))
+        except OSError:
+            continue
+        for entry in sorted(entries, key=lambda e: e.name):
+            if not entry.name.endswith(('.dist-info', '.egg-info')):
+                continue
+            try:
+                with open(os.path.join(entry.path, 'entry_points.txt'), encoding='utf-8') as f:
+                    lines = f.read().splitlines()
+            except OSError:
+                continue
+            in_group = False
+            for line in lines:
+                line = line.strip()
+                if line.startswith('['):
+                    in_group = line == header
+                elif in_group and '=' in line and not line.startswith(('#', ';')):
+                    name, _, target = line.partition('=')
+                    yield name.strip(), target.strip()
+
+
+BUILTINS = BuiltinRegistry()
+BUILTINS.register('cat', 'builtin_commands.cat:Cat')
+BUILTINS.register('echo', 'builtin_commands.echo:Echo')
+BUILTINS.register('exit', 'builtin_commands.exit:Exit')
+BUILTINS.register('export', 'builtin_commands.export:Export')
+BUILTINS.register('fg', 'builtin_commands.fg:Fg')
+BUILTINS.register('grep', 'builtin_commands.grep:Grep')
+BUILTINS.register('hash', 'builtin_commands.hash:Hash')
+BUILTINS.register('head', 'builtin_commands.head:Head')
+BUILTINS.register('jobs', 'builtin_commands.jobs:Jobs')
+BUILTINS.register('pwd', 'builtin_commands.pwd:Pwd')
+BUILTINS.register('stats', 'builtin_commands.stats:Stats')
+BUILTINS.register('tail', 'builtin_commands.tail:Tail')
+BUILTINS.register('wait', 'builtin_commands.wait:Wait')
+BUILTINS.register('wc', 'builtin_commands.wc:Wc')
@@ -1,6 +1,6 @@
-from dataclasses import dataclass
-from enum import Enum
-from typing import List, Optional
+from enum import Enum, IntFlag
+from typing import Iterable, NamedTuple, Sequence, Tuple, Union
+from builtin_registry import BUILTINS
 
 
 class CommandType(Enum):
@@ -10,26 +10,84 @@ class CommandType(Enum):
     PIPE = "pipe"
 
 
-@dataclass
-class Command:
+class Redirection(NamedTuple):
+    fd: int
+    op: str
+    target: str
+
+    def __str__(self) -> str:
+        return f"{self.fd}{self.op}{self.target}"
+
+
+class Command(NamedTuple):
     type: CommandType
     name: str
-    args: List[str]
-    pipe_to: Optional['Command'] = None
+    args: Tuple[str, ...]
+    redirects: Tuple[Redirection, ...] = ()
+
+    def __str__(self) -> str:
+        return ' '.join((self.name,) + self.args + tuple(str(r) for r in self.redirects))
+
+
+class StageFlag(IntFlag):
+    BUILTIN = 1
+    STDIN = 2
+    TERMINAL = 4
+
+
+class Pipeline:
+    __slots__ = ('commands', 'background', 'flags')
+    commands: Tuple[Command, ...]
+    background: bool
+    flags: Tuple[StageFlag, ...]
+
+    def __init__(self, commands: Iterable[Command], background: bool = False):
+        stages = tuple(commands)
+        last = len(stages) - 1
+        flags = []
+        for i, command in enumerate(stages):
+            flag = StageFlag(0)
+            if command.type == CommandType.BUILTIN:
+                flag |= StageFlag.BUILTIN
+            if i > 0 and all(r.fd != 0 for r in command.redirects):
+                flag |= StageFlag.STDIN
+            if i == last:
+                flag |= StageFlag.TERMINAL
+            flags.append(flag)
+        object.__setattr__(self, 'commands', stages)
+        object.__setattr__(self, 'background', background)
+        object.__setattr__(self, 'flags', tuple(flags))
+
+    def __setattr__(self, name: str, value: object) -> None:
+        raise AttributeError(f"cannot assign to Pipeline.{name}")
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Pipeline):
+            return NotImplemented
+        return self.commands == other.commands and self.background == other.background
+
+    def __hash__(self) -> int:
+        return hash((self.commands, self.background))
+
+    def __repr__(self) -> str:
+        return f"Pipeline({self.commands!r}, background={self.background!r})"
+
+    def __str__(self) -> str:
+        text = ' | '.join(map(str, self.commands))
+        return text + ' &' if self.background else text
+
+
+def as_pipeline(command: Union[Command, Pipeline]) -> Pipeline:
+    return command if isinstance(command, Pipeline) else Pipeline((command,))
 
 
 class CommandFactory:
-    BUILTIN_COMMANDS = {'cat', 'echo', 'wc', 'pwd', 'exit', 'grep'}
+    BUILTIN_COMMANDS = BUILTINS
 
     @classmethod
     def create(cls,
                command_type: CommandType,
                name: str,
-               args: List[str],
-               pipe_to: Optional[Command] = None) -> Command:
-        return Command(
-            type=command_type,
-            name=name,
-            args=args,
-            pipe_to=pipe_to
-        )
+               args: Sequence[str],
+               redirects: Sequence[Redirection] = ()) -> Command:
+        return Command(command_type, name, tuple(args), tuple(redirects))
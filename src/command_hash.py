@@ -0,0 +1,60 @@
+import copy
+import os
+from typing import Dict, List, Optional, Tuple
+from environment_manager import EnvironmentManager
+
+
+class CommandHash:
+    def __init__(self, env: EnvironmentManager):
+        self.env = env
+        self._path: Optional[str] = None
+        self._paths: Dict[str, str] = {}
+        self._hits: Dict[str, int] = {}
+
+    def bind(self, env: EnvironmentManager) -> 'CommandHash':
+        table = copy.copy(self)
+        table.env = env
+        return table
+
+    def lookup(self, name: str) -> Optional[str]:
+        if os.sep in name or (os.altsep and os.altsep in name):
+            return name
+        self._check_path()
+        path = self._paths.get(name)
+        if path is None:
+            path = self.remember(name)
+            if path is None:
+                return None
+        self._hits[name] += 1
+        return path
+
+    def remember(self, name: str) -> Optional[str]:
+        import shutil
+
+        self._check_path()
+        path = shutil.which(name, path=self._path)
+        if path is None:
+            self.forget(name)
+            return None
+        self._paths[name] = path
+        self._hits[name] = 0
+        return path
+
+    def forget(self, name: str) -> None:
+        self._paths.pop(name, None)
+        self._hits.pop(name, None)
+
+    def clear(self) -> None:
+        self._paths.clear()
+        self._hits.clear()
+
+    def items(self) -> List[Tuple[str, str, int]]:
+        self._check_path()
+        return [(name, path, self._hits[name]) for name, path in self._paths.items()]
+
+    def _check_path(self) -> None:
+        path = self.env.get('PATH', os.defpath)
+        if path != self._path:
+            self._paths = {}
+            self._hits = {}
+            self._path = path
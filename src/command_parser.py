@@ -1,174 +1,406 @@
-from typing import Optional, List, Tuple
-from command import CommandType, Command, CommandFactory
+import re
+import functools
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple, Union
+from builtin_registry import BUILTINS
+from command import CommandType, Command, CommandFactory, Pipeline, Redirection
 from environment_manager import EnvironmentManager
+from pipeline_executor import OutputLimitExceeded
+from syntax_tree import (AssignmentNode, CommandSub, Literal, PipelineNode, Redirect,
+                         SimpleCommand, Tree, Var, Word, WordPart)
 
+if TYPE_CHECKING:
+    from concurrent.futures import ThreadPoolExecutor
 
-class CommandParser:
-    def __init__(self, env: EnvironmentManager, process_manager):
-        self.env = env
-        self.process_manager = process_manager
+PARSE_CACHE_SIZE = 1024
+SUBSTITUTION_LIMIT = 64 * 1024 * 1024
+WORD_BREAKS = frozenset(' \t\n\r\x0b\x0c|&<>\'"\\$')
 
-    def parse(self, input_str: str) -> Optional[Command]:
-        input_str = input_str.strip()
-        if not input_str:
-            return None
+# Each alternative consumes a whole run of input, so ordinary text costs a
+# single regex step however long it is.
+UNQUOTED_TOKEN = re.compile(r"""
+    (?P<redirect>(?P<fd>[0-9])?(?P<op>>>|>&|>|<))
+  | (?P<word>[^\s|&<>'"\\$]+)(?:\s+|\Z)
+  | (?P<text>[^\s|&<>'"\\$]+)
+  | (?P<space>\s+)
+  | (?P<pipe>\|)
+  | (?P<amp>&)
+  | '(?P<single>[^']*)'?
+  | "(?P<plain>[^"\\$]*)"
+  | (?P<double>")
+  | \\(?P<escaped>.?)
+  | \$\{(?P<braced>[^}]*)\}
+  | (?P<unclosed>\$\{)
+  | \$(?P<name>\w+)
+  | (?P<subst>\$\()
+  | (?P<dollar>\$)
+""", re.VERBOSE | re.DOTALL)
 
-        if '=' in input_str and not input_str.startswith('='):
-            return self._parse_assignment(input_str)
+DOUBLE_QUOTED_TOKEN = re.compile(r"""
+    (?P<text>[^"\\$]+)
+  | (?P<end>")
+  | \\(?P<escaped>[$`"\\\n])
+  | (?P<backslash>\\)
+  | \$\{(?P<braced>[^}]*)\}
+  | (?P<unclosed>\$\{)
+  | \$(?P<name>\w+)
+  | (?P<subst>\$\()
+  | (?P<dollar>\$)
+""", re.VERBOSE)
 
-        parts = self._split_pipes(input_str)
-        if not parts:
-            return None
+PAREN_TOKEN = re.compile(r"""
+    [^()\\'"]+
+  | \\.?
+  | '[^']*'?
+  | "(?:[^"\\]|\\.)*"?
+  | (?P<open>\()
+  | (?P<close>\))
+""", re.VERBOSE | re.DOTALL)
 
-        commands = []
-        for part in parts:
-            tokens = self._tokenize(part)
-            if not tokens:
-                return None
-            cmd_name = self._expand(tokens[0], handle_command_sub=True)
-            args = [self._expand(t, handle_command_sub=True)
-                    for t in tokens[1:]]
-            commands.append(self._create_command(cmd_name, args))
-
-        for i in range(len(commands)-1):
-            commands[i].pipe_to = commands[i+1]
-
-        return commands[0] if commands else None
-
-    def _split_pipes(self, s: str) -> List[str]:
-        parts = []
-        current = []
-        quote = None
-        escape = False
-
-        for c in s:
-            if escape:
-                current.append(c)
-                escape = False
-            elif c == '\\':
-                escape = True
-                current.append(c)
-            elif c in ('"', "'"):
-                if quote == c:
-                    quote = None
-                elif not quote:
-                    quote = c
-                current.append(c)
-            elif c == '|' and not quote:
-                parts.append(''.join(current).strip())
-                current = []
-            else:
-                current.append(c)
-        if current:
-            parts.append(''.join(current).strip())
-        return parts
-
-    def _parse_assignment(self, s: str) -> Command:
-        var, value = s.split('=', 1)
-        var = var.strip()
-        if not var.isidentifier():
-            raise ValueError(f"Invalid variable name: {var}")
-        return CommandFactory.create(
-            CommandType.ASSIGNMENT,
-            var,
-            [self._expand(value.strip(), handle_command_sub=True)]
-        )
 
-    def _tokenize(self, s: str) -> List[str]:
-        tokens = []
-        buffer = []
-        quote = None
-        escape = False
-
-        for c in s:
-            if escape:
-                buffer.append(c)
-                escape = False
-            elif c == '\\':
-                escape = True
-            elif c in ('"', "'"):
-                if quote == c:
-                    quote = None
-                elif not quote:
-                    quote = c
+class _Lexer:
+    def __init__(self, s: str, pipes: bool = True):
+        self.s = s
+        self.pipes = pipes
+        self.commands: List[SimpleCommand] = []
+        self.words: List[Word] = []
+        self.parts: List[WordPart] = []
+        self.literal: List[str] = []
+        self.in_word = False
+        self.background = False
+        self.redirects: List[Redirect] = []
+        self.redirect: Optional[Tuple[int, str]] = None
+
+    def scan(self) -> List[SimpleCommand]:
+        s = self.s
+        n = len(s)
+        literal = self.literal
+        pos = 0
+        while pos < n:
+            for m in UNQUOTED_TOKEN.finditer(s, pos):
+                kind = m.lastgroup
+                if kind == 'word':
+                    if self.in_word or self.redirect is not None:
+                        literal.append(m.group('word'))
+                        self.in_word = True
+                        self._end_word()
+                    else:
+                        self.words.append(Word((Literal(m.group('word')),)))
+                elif kind == 'redirect':
+                    if self.pipes:
+                        self._redirect(m)
+                    else:
+                        literal.append(m.group('redirect'))
+                        self.in_word = True
+                elif kind == 'space':
+                    self._end_word()
+                elif kind == 'pipe':
+                    if self.pipes:
+                        self._end_command()
+                    else:
+                        literal.append('|')
+                        self.in_word = True
+                elif kind == 'amp':
+                    if not self.pipes:
+                        literal.append('&')
+                        self.in_word = True
+                    elif s[m.end():].strip():
+                        raise ValueError("Syntax error near unexpected token `&'")
+                    else:
+                        self.background = True
+                elif kind == 'double':
+                    pos = self._double_quoted(m.end())
+                    self.in_word = True
+                    break
+                elif kind == 'subst':
+                    pos = self._dollar(m, kind)
+                    self.in_word = True
+                    break
+                elif kind in ('text', 'single', 'plain', 'escaped'):
+                    text = m.group(kind)
+                    if text:
+                        literal.append(text)
+                    self.in_word = True
                 else:
-                    buffer.append(c)
-            elif not quote and c.isspace():
-                if buffer:
-                    tokens.append(''.join(buffer))
-                    buffer = []
+                    self._dollar(m, kind)
+                    self.in_word = True
             else:
-                buffer.append(c)
-        if buffer:
-            tokens.append(''.join(buffer))
-        return tokens
+                pos = n
+        self._end_command()
+        return self.commands
 
-    def _expand(self, s: str, handle_command_sub: bool = False) -> str:
-        result = []
-        i = 0
-        while i < len(s):
-            if s[i] == '$' and (i == 0 or s[i-1] != '\\'):
-                if i+1 < len(s) and s[i+1] == '(' and handle_command_sub:
-                    cmd_output, i = self._read_command_substitution(s, i+2)
-                    result.append(cmd_output)
-                else:
-                    var_name, i = self._read_var(s, i+1)
-                    result.append(self.env.get(var_name, ''))
+    def _redirect(self, m) -> None:
+        fd, op = m.group('fd'), m.group('op')
+        if fd is not None and self.in_word:
+            self.literal.append(fd)
+            fd = None
+        self._end_word()
+        if self.redirect is not None:
+            raise ValueError(f"Syntax error near unexpected token `{op}'")
+        self.redirect = (int(fd) if fd is not None else 0 if op == '<' else 1, op)
+
+    def _double_quoted(self, pos: int) -> int:
+        s = self.s
+        n = len(s)
+        match = DOUBLE_QUOTED_TOKEN.match
+        while pos < n:
+            m = match(s, pos)
+            assert m is not None
+            kind = m.lastgroup
+            pos = m.end()
+            if kind == 'text':
+                self.literal.append(m.group('text'))
+            elif kind == 'end':
+                return pos
+            elif kind == 'escaped':
+                self.literal.append(m.group('escaped'))
+            elif kind == 'backslash':
+                self.literal.append('\\')
             else:
-                result.append(s[i])
-                i += 1
-        return ''.join(result).replace('\\$', '$')
+                pos = self._dollar(m, kind)
+        return n
 
-    def _read_command_substitution(self, s: str, start: int) -> Tuple[str, int]:
+    def _dollar(self, m, kind: Optional[str]) -> int:
+        if kind == 'name':
+            self._add_part(Var(m.group('name')))
+        elif kind == 'braced':
+            self._add_part(Var(m.group('braced')))
+        elif kind == 'subst':
+            end = self._closing_paren(m.end())
+            self._add_part(CommandSub(self.s[m.end():end]))
+            return end + 1
+        elif kind == 'unclosed':
+            raise ValueError("Unclosed variable substitution")
+        else:
+            self.literal.append('$')
+        return m.end()
+
+    def _closing_paren(self, pos: int) -> int:
+        s = self.s
+        n = len(s)
+        match = PAREN_TOKEN.match
         depth = 1
-        i = start
-        while i < len(s):
-            if s[i] == '(':
+        while pos < n:
+            m = match(s, pos)
+            assert m is not None
+            kind = m.lastgroup
+            if kind == 'open':
                 depth += 1
-            elif s[i] == ')':
+            elif kind == 'close':
                 depth -= 1
                 if depth == 0:
-                    break
-            i += 1
-        if i >= len(s):
-            raise ValueError("Unclosed command substitution")
-        command_str = s[start:i]
-        output = self._execute_command_substitution(command_str)
-        return output, i+1
+                    return pos
+            pos = m.end()
+        raise ValueError("Unclosed command substitution")
+
+    def _add_part(self, part: WordPart) -> None:
+        if self.literal:
+            self.parts.append(Literal(''.join(self.literal)))
+            self.literal.clear()
+        self.parts.append(part)
+
+    def _end_word(self) -> None:
+        if not self.in_word:
+            return
+        if self.literal or not self.parts:
+            self.parts.append(Literal(''.join(self.literal)))
+            self.literal.clear()
+        word = Word(tuple(self.parts))
+        if self.redirect is not None:
+            self.redirects.append(Redirect(*self.redirect, word))
+            self.redirect = None
+        else:
+            self.words.append(word)
+        self.parts = []
+        self.in_word = False
+
+    def _end_command(self) -> None:
+        self._end_word()
+        if self.redirect is not None:
+            raise ValueError("Syntax error: missing redirection target")
+        self.commands.append(SimpleCommand(tuple(self.words), tuple(self.redirects)))
+        self.words = []
+        self.redirects = []
+
+
+def _assignment_name(line: str) -> Optional[str]:
+    for i, c in enumerate(line):
+        if c == '=':
+            if i == 0:
+                return None
+            name = line[:i]
+            if not name.isidentifier():
+                raise ValueError(f"Invalid variable name: {name}")
+            return name
+        if c in WORD_BREAKS:
+            return None
+    return None
 
-    def _execute_command_substitution(self, command_str: str) -> str:
-        from command_parser import CommandParser
-        temp_parser = CommandParser(self.env, self.process_manager)
-        command = temp_parser.parse(command_str)
-        if not command:
-            return ""
-        stdout, _, _ = self.process_manager.execute_capture(command)
-        return stdout.strip()
 
-    def _read_var(self, s: str, start: int) -> Tuple[str, int]:
-        if start >= len(s):
-            return '', start
+@functools.lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_tree(line: str) -> Optional[Tree]:
+    line = line.strip()
+    if not line:
+        return None
 
-        if s[start] == '{':
-            end = s.find('}', start+1)
-            if end == -1:
-                return s[start+1:], len(s)
-            return s[start+1:end], end+1
+    name = _assignment_name(line)
+    if name is not None:
+        value = _Lexer(line[len(name)+1:].strip(), pipes=False).scan()
+        return AssignmentNode(name, value[0].words)
 
-        end = start
-        while end < len(s) and (s[end].isalnum() or s[end] == '_'):
-            end += 1
-        return s[start:end], end
+    lexer = _Lexer(line)
+    commands = lexer.scan()
+    if any(not command.words for command in commands):
+        return None
+    return PipelineNode(tuple(commands), lexer.background)
+
+
+class CommandParser:
+    def __init__(self, env: EnvironmentManager, process_manager,
+                 substitution_limit: Optional[int] = SUBSTITUTION_LIMIT,
+                 substitution_jobs: int = 1,
+                 memoize_substitutions: bool = True):
+        self.env = env
+        self.process_manager = process_manager
+        self.substitution_limit = substitution_limit
+        self.substitution_jobs = substitution_jobs
+        self.memoize_substitutions = memoize_substitutions
+        self._executor: Optional['ThreadPoolExecutor'] = None
+        self._local = threading.local()
+
+    def parse(self, input_str: str) -> Optional[Union[Command, Pipeline]]:
+        tree = parse_tree(input_str)
+        if tree is None:
+            return None
+        return self.expand(tree)
+
+    def parse_tree(self, input_str: str) -> Optional[Tree]:
+        return parse_tree(input_str)
+
+    def expand(self, tree: Tree) -> Union[Command, Pipeline]:
+        if isinstance(tree, AssignmentNode):
+            words = tree.words
+        else:
+            words = tuple(word for node in tree.commands
+                          for word in node.words + tuple(r.target for r in node.redirects))
+        subs = [part for word in words for part in word.parts if type(part) is CommandSub]
+        outputs = iter(self._timed_substitutions(subs)) if subs else None
+
+        if isinstance(tree, AssignmentNode):
+            return CommandFactory.create(
+                CommandType.ASSIGNMENT,
+                tree.name,
+                [' '.join(self._expand_word(word, outputs) for word in tree.words)]
+            )
+
+        commands = []
+        for node in tree.commands:
+            expanded = [self._expand_word(word, outputs) for word in node.words]
+            redirects = [Redirection(r.fd, r.op, self._expand_word(r.target, outputs))
+                         for r in node.redirects]
+            commands.append(self._create_command(expanded[0], expanded[1:], redirects))
+
+        if len(commands) == 1 and not tree.background:
+            return commands[0]
+        return Pipeline(commands, tree.background)
+
+    def _expand_word(self, word: Word, outputs: Optional[Iterator[str]]) -> str:
+        parts = word.parts
+        if len(parts) == 1 and type(parts[0]) is Literal:
+            return parts[0].text
+        result = []
+        for part in parts:
+            if isinstance(part, Literal):
+                result.append(part.text)
+            elif isinstance(part, Var):
+                result.append(self.env.get(part.name, ''))
+            else:
+                assert outputs is not None
+                result.append(next(outputs))
+        return ''.join(result)
+
+    def _timed_substitutions(self, subs: List[CommandSub]) -> List[str]:
+        stats = self.process_manager.stats
+        if stats is None:
+            return self._run_substitutions(subs)
+        start = time.perf_counter()
+        try:
+            return self._run_substitutions(subs)
+        finally:
+            stats.substitution_ms += (time.perf_counter() - start) * 1000
+
+    def _run_substitutions(self, subs: List[CommandSub]) -> List[str]:
+        keys: List[Union[str, int]] = []
+        sources: Dict[Union[str, int], str] = {}
+        for i, sub in enumerate(subs):
+            key: Union[str, int] = i
+            if self.memoize_substitutions and self._is_pure(sub.source):
+                key = sub.source
+            keys.append(key)
+            sources.setdefault(key, sub.source)
+
+        if (self.substitution_jobs > 1 and len(sources) > 1
+                and not getattr(self._local, 'worker', False)):
+            results = self._pool().map(self._execute_command_substitution, sources.values())
+            outputs = dict(zip(sources, results))
+        else:
+            outputs = {key: self._execute_command_substitution(source)
+                       for key, source in sources.items()}
+        return [outputs[key] for key in keys]
+
+    def _is_pure(self, source: str) -> bool:
+        tree = parse_tree(source)
+        if not isinstance(tree, PipelineNode):
+            return False
+        for node in tree.commands:
+            # Redirections read or write files, so such a command is not pure.
+            if node.redirects:
+                return False
+            if any(type(part) is CommandSub for word in node.words for part in word.parts):
+                return False
+            name = node.words[0].parts
+            if len(name) != 1 or type(name[0]) is not Literal:
+                return False
+            handler = BUILTINS.get(name[0].text)
+            if handler is None or not handler.pure:
+                return False
+        return True
+
+    def _pool(self) -> 'ThreadPoolExecutor':
+        if self._executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.substitution_jobs, initializer=self._mark_worker)
+        return self._executor
+
+    def _mark_worker(self) -> None:
+        self._local.worker = True
+
+    def _execute_command_substitution(self, command_str: str) -> str:
+        command = self.parse(command_str)
+        if not command:
+            return ""
+        subshell = self.process_manager.subshell()
+        try:
+            stdout, _ = subshell.capture(command, self.substitution_limit)
+        except OutputLimitExceeded:
+            raise ValueError(
+                f"Command substitution output exceeds {self.substitution_limit} bytes")
+        return subshell.decode(stdout).strip()
 
-    def _create_command(self, name: str, args: List[str]) -> Command:
+    def _create_command(self, name: str, args: List[str],
+                        redirects: List[Redirection]) -> Command:
         if name in CommandFactory.BUILTIN_COMMANDS:
             return CommandFactory.create(
                 CommandType.BUILTIN,
                 name,
-                args
+                args,
+                redirects
             )
         return CommandFactory.create(
             CommandType.EXTERNAL,
             name,
-            args
+            args,
+            redirects
         )
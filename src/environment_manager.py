@@ -1,24 +1,56 @@
 import os
 import re
-from typing import Dict
+from collections import ChainMap
+from typing import Dict, Optional, Tuple
 
 
 class EnvironmentManager:
-    def __init__(self):
-        self.local_vars: Dict[str, str] = {}
-        self.system_vars = os.environ.copy()
+    def __init__(self, parent: Optional['EnvironmentManager'] = None):
+        self.parent = parent
+        self.version = 0
+        if parent is None:
+            self._vars: ChainMap = ChainMap(dict(os.environ))
+            self._exported: ChainMap = ChainMap(dict.fromkeys(os.environ, True))
+        else:
+            self._vars = parent._vars.new_child()
+            self._exported = parent._exported.new_child()
+        self._environment: Dict[str, str] = {}
+        self._environment_key: Optional[Tuple[int, ...]] = None
 
-    def set_var(self, name: str, value: str) -> None:
+    def overlay(self) -> 'EnvironmentManager':
+        return EnvironmentManager(self)
+
+    def set_var(self, name: str, value: str, export: Optional[bool] = True) -> None:
         if not name.isidentifier():
             raise ValueError(f"Invalid variable name: {name}")
-        self.local_vars[name] = value
+        if export is None:
+            export = self.is_exported(name)
+        if self._vars.get(name) == value and self.is_exported(name) == export:
+            return
+        self._vars[name] = value
+        self._exported[name] = export
+        self.version += 1
+
+    def export(self, name: str, value: Optional[str] = None) -> None:
+        self.set_var(name, self.get(name) if value is None else value, export=True)
 
     def unset_var(self, name: str) -> None:
-        if name in self.local_vars:
-            del self.local_vars[name]
+        if self._vars.get(name) is None:
+            return
+        if self.parent is None:
+            del self._vars[name]
+            self._exported.pop(name, None)
+        else:
+            self._vars[name] = None
+            self._exported[name] = False
+        self.version += 1
 
     def get(self, name: str, default: str = "") -> str:
-        return self.local_vars.get(name, self.system_vars.get(name, default))
+        value = self._vars.get(name)
+        return default if value is None else value
+
+    def is_exported(self, name: str) -> bool:
+        return self._exported.get(name, False)
 
     def expand(self, input_str: str) -> str:
         pattern = re.compile(
@@ -66,6 +98,20 @@ class EnvironmentManager:
         return ''.join(result)
 
     def get_environment(self) -> Dict[str, str]:
-        env = self.system_vars.copy()
-        env.update(self.local_vars)
-        return env
+        if self.version == 0 and self.parent is not None:
+            return self.parent.get_environment()
+        key = self._versions()
+        if key != self._environment_key:
+            exported = self._exported
+            self._environment = {name: value for name, value in self._vars.items()
+                                 if value is not None and exported.get(name, False)}
+            self._environment_key = key
+        return self._environment
+
+    def _versions(self) -> Tuple[int, ...]:
+        env: Optional[EnvironmentManager] = self
+        versions = []
+        while env is not None:
+            versions.append(env.version)
+            env = env.parent
+        return tuple(versions)
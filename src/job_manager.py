@@ -0,0 +1,86 @@
+import threading
+from typing import Callable, Dict, List, Optional
+from pipeline_executor import RunningPipeline, Sink
+
+
+class Job:
+    def __init__(self, job_id: int, text: str, pipeline: RunningPipeline):
+        self.id = job_id
+        self.text = text
+        self.pipeline = pipeline
+        self.code: Optional[int] = None
+        self.done = threading.Event()
+
+    @property
+    def pid(self) -> Optional[int]:
+        for stage in reversed(self.pipeline.stages):
+            if stage.process is not None:
+                return stage.process.pid
+        return None
+
+    @property
+    def status(self) -> str:
+        if not self.done.is_set():
+            return 'Running'
+        if self.code == 0:
+            return 'Done'
+        return f"Exit {self.code}"
+
+    def wait(self) -> int:
+        self.done.wait()
+        assert self.code is not None
+        return self.code
+
+    def __str__(self) -> str:
+        return f"[{self.id}]  {self.status:<10}{self.text}"
+
+
+class JobTable:
+    def __init__(self):
+        self._jobs: Dict[int, Job] = {}
+        self._lock = threading.Lock()
+
+    def start(self, text: str, pipeline: RunningPipeline,
+              sink: Sink, close: Callable[[], None]) -> Job:
+        with self._lock:
+            job_id = max(self._jobs, default=0) + 1
+            job = self._jobs[job_id] = Job(job_id, text, pipeline)
+        thread = threading.Thread(target=self._watch, args=(job, sink, close), daemon=True)
+        thread.start()
+        return job
+
+    def get(self, job_id: Optional[int] = None) -> Optional[Job]:
+        with self._lock:
+            if job_id is None:
+                job_id = max(self._jobs, default=0)
+            return self._jobs.get(job_id)
+
+    def jobs(self) -> List[Job]:
+        with self._lock:
+            return [self._jobs[job_id] for job_id in sorted(self._jobs)]
+
+    def find(self, spec: str) -> Optional[Job]:
+        job_id = spec[1:] if spec.startswith('%') else spec
+        if not job_id.isdigit():
+            return None
+        return self.get(int(job_id))
+
+    def remove(self, job: Job) -> None:
+        with self._lock:
+            self._jobs.pop(job.id, None)
+
+    def reap(self) -> List[Job]:
+        with self._lock:
+            finished = [job for job in self._jobs.values() if job.done.is_set()]
+            for job in finished:
+                del self._jobs[job.id]
+        return sorted(finished, key=lambda job: job.id)
+
+    @staticmethod
+    def _watch(job: Job, sink: Sink, close: Callable[[], None]) -> None:
+        try:
+            job.pipeline.drain(sink)
+            close()
+        finally:
+            job.code = job.pipeline.wait()
+            job.done.set()
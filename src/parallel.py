@@ -0,0 +1,29 @@
+import os
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from concurrent.futures import ProcessPoolExecutor
+
+
+def process_pool(jobs: int) -> 'ProcessPoolExecutor':
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    # Pipelines run builtins in threads, so forking the interpreter could
+    # copy a lock held by another thread; spawned workers start clean.
+    return ProcessPoolExecutor(max_workers=jobs,
+                               mp_context=multiprocessing.get_context('spawn'))
+
+
+def parse_jobs(value: Optional[str]) -> int:
+    if not value:
+        return 1
+    jobs = int(value)
+    if jobs < 0:
+        raise ValueError(f"invalid number of jobs: {value}")
+    return jobs or (os.cpu_count() or 1)
+
+
+def split_range(size: int, parts: int) -> List[Tuple[int, int]]:
+    step = -(-size // parts)
+    return [(start, min(start + step, size)) for start in range(0, size, step)]
@@ -0,0 +1,388 @@
+import io
+import os
+import sys
+import codecs
+import threading
+import time
+from typing import IO, TYPE_CHECKING, Any, Callable, List, NamedTuple, Optional, TextIO, Tuple, Union
+from builtin_registry import CHUNK_SIZE, BuiltinCommand
+from command import Command, Pipeline, StageFlag
+from profiler import CommandStats, StageStats
+from redirection import child_fds
+
+if TYPE_CHECKING:
+    import subprocess
+
+Sink = Callable[[Union[bytes, memoryview]], object]
+
+
+class TextSink:
+    def __init__(self, stream: TextIO, encoding: str = 'utf-8', errors: str = 'replace',
+                 autoflush: bool = True):
+        self.stream = stream
+        self.buffer = getattr(stream, 'buffer', None)
+        self.decoder = codecs.getincrementaldecoder(encoding)(errors=errors)
+        self.autoflush = autoflush
+        if self.buffer is not None and autoflush:
+            stream.flush()
+
+    def write(self, data: Union[bytes, memoryview]) -> None:
+        if self.buffer is not None:
+            self.buffer.write(data)
+            if self.autoflush:
+                self.buffer.flush()
+        else:
+            self.stream.write(self.decoder.decode(data))
+
+    def fileno(self) -> int:
+        if self.buffer is None:
+            raise io.UnsupportedOperation('fileno')
+        return self.buffer.fileno()
+
+    def flush(self) -> None:
+        self.stream.flush()
+
+    def close(self) -> None:
+        if self.buffer is None:
+            tail = self.decoder.decode(b'', final=True)
+            if tail:
+                self.stream.write(tail)
+        if self.autoflush:
+            self.stream.flush()
+
+
+def stream_fileno(stream: IO[Any]) -> Optional[int]:
+    try:
+        return stream.fileno()
+    except (AttributeError, ValueError, io.UnsupportedOperation):
+        return None
+
+
+def feed_pipe(fd: int, data: bytes) -> int:
+    try:
+        with open(fd, 'wb') as stdin:
+            stdin.write(data)
+    except BrokenPipeError:
+        pass
+    return 0
+
+
+def pipeline_status(codes: List[int]) -> int:
+    exit_code = 0
+    for i, code in enumerate(codes):
+        # A producer killed by SIGPIPE only means that a later stage stopped
+        # reading early (head, grep -m), which is not a failure.
+        if code < 0 and i < len(codes) - 1:
+            import signal
+
+            if code == -getattr(signal, 'SIGPIPE', 0):
+                continue
+        if code != 0:
+            exit_code = code
+    return exit_code
+
+
+class OutputLimitExceeded(BrokenPipeError):
+    pass
+
+
+class CaptureBuffer(io.BytesIO):
+    def __init__(self, limit: Optional[int] = None):
+        super().__init__()
+        self.limit = limit
+
+    def write(self, data) -> int:
+        if self.limit is not None and self.tell() + len(data) > self.limit:
+            raise OutputLimitExceeded(f"output exceeds {self.limit} bytes")
+        return super().write(data)
+
+
+class Segment(NamedTuple):
+    commands: Tuple[Command, ...]
+    flags: StageFlag
+
+    @property
+    def fused(self) -> bool:
+        return len(self.commands) > 1
+
+
+class _SinkWriter:
+    def __init__(self, sink: Sink):
+        self.write = sink
+
+
+class Stage:
+    def __init__(self, command: Command, fused: Tuple[Command, ...] = ()):
+        self.command = command
+        self.fused = fused
+        self.process: Optional['subprocess.Popen'] = None
+        self.threads: List[threading.Thread] = []
+        self.code = 0
+        self.stats: Optional[StageStats] = None
+
+    def wait(self) -> int:
+        if self.process is not None:
+            if self.stats is not None and hasattr(os, 'wait4'):
+                self.code = self._wait4(self.process, self.stats)
+            else:
+                self.code = self.process.wait()
+        for thread in self.threads:
+            thread.join()
+        return self.code
+
+    @staticmethod
+    def _wait4(process: 'subprocess.Popen', stats: StageStats) -> int:
+        if process.returncode is not None:
+            return process.returncode
+        _, status, usage = os.wait4(process.pid, 0)
+        process.returncode = -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+        if stats.wall_ms is None:
+            stats.finish((usage.ru_utime + usage.ru_stime) * 1000)
+        return process.returncode
+
+
+class RunningPipeline:
+    def __init__(self, stages: List[Stage], stdout_fd: Optional[int],
+                 stats: Optional[CommandStats] = None):
+        self.stages = stages
+        self.stdout_fd = stdout_fd
+        self.stats = stats
+
+    def drain(self, sink: Sink) -> None:
+        if self.stdout_fd is None:
+            return
+        if self.stats is not None:
+            sink = self._counted(sink, self.stats)
+        buffer = bytearray(CHUNK_SIZE)
+        view = memoryview(buffer)
+        with open(self.stdout_fd, 'rb', buffering=0) as stdout:
+            while True:
+                n = stdout.readinto(buffer)
+                if not n:
+                    break
+                sink(view[:n])
+
+    @staticmethod
+    def _counted(sink: Sink, stats: CommandStats) -> Sink:
+        def write(data: Union[bytes, memoryview]) -> None:
+            stats.count_output(data)
+            sink(data)
+        return write
+
+    def wait(self) -> int:
+        return pipeline_status([stage.wait() for stage in self.stages])
+
+
+class PipelineExecutor:
+    def __init__(self, process_manager):
+        self.process_manager = process_manager
+
+    def run(self, pipeline: Pipeline, sink: Sink,
+            stderr: Optional[TextIO] = None, stdout: Optional[TextIO] = None,
+            stdin_data: Optional[bytes] = None) -> int:
+        segments = self.plan(pipeline)
+        if len(segments) == 1 and segments[0].fused:
+            return self._run_inline(segments[0], sink, stderr, stdin_data)
+        running = self.start(pipeline, stderr, stdout, segments, stdin_data)
+        try:
+            running.drain(sink)
+        finally:
+            code = running.wait()
+        return code
+
+    def plan(self, pipeline: Pipeline) -> List[Segment]:
+        segments: List[Segment] = []
+        group: List[Tuple[Command, StageFlag]] = []
+
+        def flush() -> None:
+            if len(group) > 1:
+                combined = (StageFlag.BUILTIN | group[0][1] & StageFlag.STDIN
+                            | group[-1][1] & StageFlag.TERMINAL)
+                segments.append(Segment(tuple(command for command, _ in group), combined))
+            else:
+                segments.extend(Segment((command,), flags) for command, flags in group)
+            group.clear()
+
+        for command, flags in zip(pipeline.commands, pipeline.flags):
+            handler = self._streaming_handler(command) if flags & StageFlag.BUILTIN else None
+            if handler is not None:
+                # A pure builtin ignores its input, so the stages before it
+                # still have to run on their own.
+                if handler.pure:
+                    flush()
+                group.append((command, flags))
+            else:
+                flush()
+                segments.append(Segment((command,), flags))
+        flush()
+        return segments
+
+    def _streaming_handler(self, command: Command) -> Optional[BuiltinCommand]:
+        if command.redirects:
+            return None
+        handler = self.process_manager.builtin(command.name)
+        return handler if handler is not None and handler.streams(list(command.args)) else None
+
+    def _run_inline(self, segment: Segment, sink: Sink,
+                    stderr: Optional[TextIO], stdin_data: Optional[bytes] = None) -> int:
+        stats = self.process_manager.stats
+        stage_stats = None
+        if stats is not None:
+            sink = RunningPipeline._counted(sink, stats)
+            stage_stats = StageStats('|'.join(command.name for command in segment.commands), 'fused')
+            stats.stages.append(stage_stats)
+        writer: Any = _SinkWriter(sink)
+        stdin = io.BytesIO(stdin_data) if stdin_data is not None else None
+        return self.process_manager.execute_fused_stream(
+            segment.commands, stdin, writer, stderr if stderr is not None else sys.stderr, stage_stats)
+
+    def start(self, pipeline: Pipeline, stderr: Optional[TextIO] = None,
+              stdout: Optional[TextIO] = None,
+              segments: Optional[List[Segment]] = None,
+              stdin_data: Optional[bytes] = None) -> RunningPipeline:
+        err = stderr if stderr is not None else sys.stderr
+        out_fd = stream_fileno(stdout) if stdout is not None else None
+        stats = self.process_manager.stats
+        stages: List[Stage] = []
+        stdin_fd: Optional[int] = None
+        read_fd: Optional[int]
+        feeder: Optional[threading.Thread] = None
+
+        if stdin_data is not None:
+            stdin_fd, feed_fd = os.pipe()
+            feeder = threading.Thread(target=feed_pipe, args=(feed_fd, stdin_data), daemon=True)
+            feeder.start()
+        elif pipeline.background:
+            # Without job control a background job must not take the shell's
+            # input, so it reads an empty stdin like in non-interactive shells.
+            stdin_fd = os.open(os.devnull, os.O_RDONLY)
+
+        for commands, flags in segments if segments is not None else self.plan(pipeline):
+            command = commands[0]
+            builtin = flags & StageFlag.BUILTIN
+            if stdin_fd is not None and stages and not flags & StageFlag.STDIN:
+                os.close(stdin_fd)
+                stdin_fd = None
+            if (out_fd is not None and stdout is not None and flags & StageFlag.TERMINAL
+                    and not builtin):
+                stdout.flush()
+                read_fd, write_fd = None, os.dup(out_fd)
+            else:
+                read_fd, write_fd = os.pipe()
+            stage = Stage(command, commands if len(commands) > 1 else ())
+            if stats is not None:
+                if stage.fused:
+                    stage.stats = StageStats('|'.join(c.name for c in commands), 'fused')
+                else:
+                    stage.stats = StageStats(command.name, 'builtin' if builtin else 'external')
+                stats.stages.append(stage.stats)
+            if stage.fused:
+                self._start_thread(self.run_fused, stage, stdin_fd, write_fd, err)
+            elif builtin:
+                self._start_builtin(stage, stdin_fd, write_fd, err)
+            else:
+                self._start_external(stage, stdin_fd, write_fd, err)
+            if stage.stats is not None:
+                stage.stats.spawn_ms = (time.perf_counter() - stage.stats.start) * 1000
+            stages.append(stage)
+            stdin_fd = read_fd
+
+        if feeder is not None:
+            stages[0].threads.append(feeder)
+        return RunningPipeline(stages, stdin_fd, stats)
+
+    def _start_external(self, stage: Stage, stdin_fd: Optional[int], stdout_fd: int, err: TextIO) -> None:
+        import subprocess
+
+        command = stage.command
+        executable = self.process_manager.command_hash.lookup(command.name)
+        err_fd = stream_fileno(err)
+        pump_fd: Optional[int] = None
+        opened: List[int] = []
+        try:
+            if executable is None:
+                raise FileNotFoundError(command.name)
+            if err_fd is not None:
+                err.flush()
+            else:
+                pump_fd, err_fd = os.pipe()
+                opened.append(err_fd)
+            fds = [stdin_fd, stdout_fd, err_fd]
+            opened += child_fds(command.redirects, fds)
+            stage.process = subprocess.Popen(
+                [command.name, *command.args],
+                executable=executable,
+                stdin=fds[0],
+                stdout=fds[1],
+                stderr=fds[2],
+                env=self.process_manager.env.get_environment()
+            )
+        except FileNotFoundError:
+            self.process_manager.command_hash.forget(command.name)
+            stage.code = 127
+            print(f"{command.name}: command not found", file=err)
+        except PermissionError:
+            stage.code = 126
+            print(f"{command.name}: permission denied", file=err)
+        except ValueError as e:
+            stage.code = 1
+            print(e, file=err)
+        finally:
+            os.close(stdout_fd)
+            if stdin_fd is not None:
+                os.close(stdin_fd)
+            for fd in opened:
+                os.close(fd)
+
+        if pump_fd is not None:
+            if stage.process is None:
+                os.close(pump_fd)
+                return
+            thread = threading.Thread(
+                target=self._pump_stderr, args=(open(pump_fd, 'rb'), err), daemon=True)
+            thread.start()
+            stage.threads.append(thread)
+
+    def _start_builtin(self, stage: Stage, stdin_fd: Optional[int], stdout_fd: int, err: TextIO) -> None:
+        self._start_thread(self.run_builtin, stage, stdin_fd, stdout_fd, err)
+
+    @staticmethod
+    def _start_thread(target: Callable[[Stage, Optional[int], int, TextIO], None],
+                      stage: Stage, stdin_fd: Optional[int], stdout_fd: int, err: TextIO) -> None:
+        thread = threading.Thread(target=target, args=(stage, stdin_fd, stdout_fd, err), daemon=True)
+        thread.start()
+        stage.threads.append(thread)
+
+    def run_builtin(self, stage: Stage, stdin_fd: Optional[int], stdout_fd: int, err: TextIO) -> None:
+        self._run_stage(stage, stdin_fd, stdout_fd, err, self.process_manager.execute_builtin_stream)
+
+    def run_fused(self, stage: Stage, stdin_fd: Optional[int], stdout_fd: int, err: TextIO) -> None:
+        self._run_stage(stage, stdin_fd, stdout_fd, err, self.process_manager.execute_fused_stream)
+
+    @staticmethod
+    def _run_stage(stage: Stage, stdin_fd: Optional[int], stdout_fd: int, err: TextIO,
+                   execute: Callable[..., int]) -> None:
+        stdin = open(stdin_fd, 'rb') if stdin_fd is not None else None
+        stdout = open(stdout_fd, 'wb')
+        try:
+            stage.code = execute(stage.fused or stage.command, stdin, stdout, err, stage.stats)
+        except BrokenPipeError:
+            pass
+        finally:
+            if stdin is not None:
+                stdin.close()
+            try:
+                stdout.close()
+            except BrokenPipeError:
+                pass
+
+    @staticmethod
+    def _pump_stderr(stream, err: TextIO) -> None:
+        sink = TextSink(err)
+        with stream:
+            while True:
+                chunk = stream.read1(CHUNK_SIZE)
+                if not chunk:
+                    break
+                sink.write(chunk)
+        sink.close()
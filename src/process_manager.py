@@ -1,225 +1,272 @@
 import sys
 import os
-import subprocess
-from command import Command, CommandType
+import time
+from command import Command, CommandType, Pipeline, as_pipeline
 from environment_manager import EnvironmentManager
-from typing import List, Tuple, Optional
+from builtin_registry import BUILTINS, BuiltinCommand, ChunkStream
+from command_hash import CommandHash
+from job_manager import JobTable
+from profiler import CommandStats, CountingReader, CountingWriter, Profiler, StageStats
+from redirection import builtin_streams, child_fds
+from pipeline_executor import CaptureBuffer, PipelineExecutor, TextSink
+from typing import Any, BinaryIO, Callable, Dict, Generator, Iterator, List, Sequence, Tuple, Optional, TextIO, Union, cast
 
 
 class ProcessManager:
-    def __init__(self, env: EnvironmentManager):
+    def __init__(self, env: EnvironmentManager, command_hash: Optional[CommandHash] = None,
+                 encoding: str = 'utf-8', errors: str = 'replace'):
         self.env = env
+        self.encoding = encoding
+        self.errors = errors
+        self.command_hash = command_hash.bind(env) if command_hash else CommandHash(env)
+        self.pipeline_executor = PipelineExecutor(self)
+        self.jobs = JobTable()
+        self.profiler: Optional[Profiler] = None
+        self.stats: Optional[CommandStats] = None
+        self._builtins: Dict[str, BuiltinCommand] = {}
+        self.autoflush = True
+
+    def subshell(self) -> 'ProcessManager':
+        return ProcessManager(self.env.overlay(), self.command_hash, self.encoding, self.errors)
+
+    def encode(self, text: str) -> bytes:
+        return text.encode(self.encoding, self.errors)
+
+    def decode(self, data: bytes) -> str:
+        return data.decode(self.encoding, self.errors)
+
+    def execute(self, command: Union[Command, Pipeline]) -> int:
+        if isinstance(command, Pipeline):
+            if command.background:
+                return self._start_job(command)
+            return self._execute_pipeline(command)
 
-    def execute(self, command: Command) -> int:
         if command.type == CommandType.ASSIGNMENT:
             self._handle_assignment(command)
             return 0
 
-        if command.pipe_to:
-            return self._execute_pipeline(command)
-
         if command.type == CommandType.BUILTIN:
             code = self._execute_builtin(command)
             return code if code is not None else 0
-        else:
-            return self._execute_external(command)
+        return self._execute_pipeline(Pipeline((command,)))
 
-    def execute_capture(self, command: Command, stdin_data: Optional[str] = None) -> Tuple[str, str, int]:
-        if command.type == CommandType.BUILTIN:
-            return self._execute_builtin_capture(command, stdin_data)
+    def execute_capture(self, command: Union[Command, Pipeline],
+                        stdin_data: Optional[Union[str, bytes]] = None) -> Tuple[str, str, int]:
+        if isinstance(command, Pipeline):
+            if stdin_data is None or len(command.commands) > 1:
+                return self._execute_pipeline_capture(command, stdin_data)
+            single = command.commands[0]
+        else:
+            single = command
+        if stdin_data is None and single.type == CommandType.EXTERNAL:
+            return self._execute_pipeline_capture(Pipeline((single,)))
+        if single.type == CommandType.BUILTIN:
+            return self._execute_builtin_capture(single, stdin_data)
         else:
-            return self._execute_external_capture(command, stdin_data)
+            return self._execute_external_capture(single, stdin_data)
 
-    def _execute_pipeline(self, command: Optional[Command]) -> int:
-        current_cmd = command
-        input_data = None
-        exit_code = 0
+    def capture(self, command: Union[Command, Pipeline],
+                limit: Optional[int] = None) -> Tuple[bytes, int]:
+        if isinstance(command, Command) and command.type == CommandType.ASSIGNMENT:
+            self._handle_assignment(command)
+            return b'', 0
+        buffer = CaptureBuffer(limit)
+        if isinstance(command, Command) and command.type == CommandType.BUILTIN:
+            code = self.execute_builtin_stream(command, None, buffer, sys.stderr)
+        else:
+            code = self.pipeline_executor.run(as_pipeline(command), buffer.write)
+        return buffer.getvalue(), code
 
-        while current_cmd:
-            stdout, stderr, code = self.execute_capture(
-                current_cmd, input_data)
-            if code != 0:
-                exit_code = code
-            input_data = stdout
-            current_cmd = current_cmd.pipe_to
-            if stderr:
-                print(stderr, file=sys.stderr, end='')
+    def _start_job(self, command: Pipeline) -> int:
+        pipeline = self.pipeline_executor.start(command, stdout=sys.stdout)
+        sink = self._stdout_sink()
+        job = self.jobs.start(str(command), pipeline, sink.write, sink.close)
+        pid = job.pid
+        print(f"[{job.id}] {pid}" if pid is not None else f"[{job.id}]", file=sys.stderr)
+        return 0
 
-        if input_data:
-            print(input_data, end='')
+    def _execute_pipeline(self, pipeline: Pipeline) -> int:
+        sink = self._stdout_sink()
+        exit_code = self.pipeline_executor.run(pipeline, sink.write, stdout=sys.stdout)
+        sink.close()
         return exit_code
 
-    def _execute_external_capture(self, command: Command, stdin_data: Optional[str]) -> Tuple[str, str, int]:
+    def _stdout_sink(self) -> TextSink:
+        return TextSink(sys.stdout, self.encoding, self.errors, autoflush=self.autoflush)
+
+    def _execute_pipeline_capture(self, pipeline: Pipeline,
+                                  stdin_data: Optional[Union[str, bytes]] = None) -> Tuple[str, str, int]:
+        import io
+
+        if isinstance(stdin_data, str):
+            stdin_data = self.encode(stdin_data)
+        stdout_buf = io.BytesIO()
+        stderr_buf = io.StringIO()
+        exit_code = self.pipeline_executor.run(pipeline, stdout_buf.write, stderr_buf,
+                                               stdin_data=stdin_data)
+        return (self.decode(stdout_buf.getvalue()), stderr_buf.getvalue(), exit_code)
+
+    def _execute_external_capture(self, command: Command,
+                                  stdin_data: Optional[Union[str, bytes]]) -> Tuple[str, str, int]:
+        import subprocess
+
+        executable = self.command_hash.lookup(command.name)
+        if executable is None:
+            return ("", f"{command.name}: command not found", 127)
+        if isinstance(stdin_data, str):
+            stdin_data = self.encode(stdin_data)
+        fds = [subprocess.PIPE, subprocess.PIPE, subprocess.PIPE]
+        try:
+            opened = child_fds(command.redirects, fds)
+        except ValueError as e:
+            return ("", str(e), 1)
         try:
             proc = subprocess.run(
-                [command.name] + command.args,
-                input=stdin_data,
+                [command.name, *command.args],
+                executable=executable,
+                input=stdin_data if fds[0] == subprocess.PIPE else None,
                 env=self.env.get_environment(),
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
+                stdin=None if fds[0] == subprocess.PIPE else fds[0],
+                stdout=fds[1],
+                stderr=fds[2]
             )
-            return (proc.stdout, proc.stderr, proc.returncode)
+            return (self.decode(proc.stdout or b''), self.decode(proc.stderr or b''), proc.returncode)
         except FileNotFoundError:
+            self.command_hash.forget(command.name)
             return ("", f"{command.name}: command not found", 127)
         except PermissionError:
             return ("", f"{command.name}: permission denied", 126)
+        finally:
+            for fd in opened:
+                os.close(fd)
 
-    def _execute_builtin_capture(self, command: Command, stdin_data: Optional[str]) -> Tuple[str, str, int]:
+    def _execute_builtin_capture(self, command: Command,
+                                 stdin_data: Optional[Union[str, bytes]]) -> Tuple[str, str, int]:
         import io
-        from contextlib import redirect_stdout, redirect_stderr
 
-        stdout_buf = io.StringIO()
+        stdin = None
+        if stdin_data is not None:
+            stdin = io.BytesIO(self.encode(stdin_data)
+                               if isinstance(stdin_data, str) else stdin_data)
+        stdout_buf = io.BytesIO()
         stderr_buf = io.StringIO()
-        code = 0
-
-        with redirect_stdout(stdout_buf), redirect_stderr(stderr_buf):
-            try:
-                if command.name == 'echo':
-                    print(' '.join(command.args))
-                elif command.name == 'cat':
-                    if not command.args:
-                        raise ValueError("Missing file argument")
-                    try:
-                        with open(command.args[0], 'r') as f:
-                            print(f.read())
-                    except Exception as e:
-                        print(f"cat: {e}", file=sys.stderr)
-                        raise
-                elif command.name == 'wc':
-                    if not command.args and not stdin_data:
-                        print("wc: missing file argument", file=sys.stderr)
-                        code = 1
-                    else:
-                        content = stdin_data if not command.args else open(
-                            command.args[0], 'rb').read()
-                        lines = 0
-                        words = 0
-                        bytes_cnt = 0
-                        if content is not None:
-                            lines = content.count(b'\n') if isinstance(
-                                content, bytes) else content.count('\n')
-                            words = len(content.split())
-                            bytes_cnt = len(content)
-                        if command.args:
-                            print(
-                                f"{lines} {words} {bytes_cnt} {command.args[0]}")
-                        else:
-                            print(f"{lines} {words} {bytes_cnt}")
-                elif command.name == 'pwd':
-                    print(os.getcwd())
-                elif command.name == 'exit':
-                    code = self._exit([])
-                elif command.name == 'grep':
-                    import re
-                    from io import StringIO
-
-                    case_insensitive = False
-                    word_boundary = False
-                    after_context = 0
-                    pattern = None
-                    filename = None
-                    args = command.args
-                    i = 0
-                    error = None
-
-                    while i < len(args):
-                        arg = args[i]
-                        if arg == '-i':
-                            case_insensitive = True
-                            i += 1
-                        elif arg == '-w':
-                            word_boundary = True
-                            i += 1
-                        elif arg == '-A':
-                            if i + 1 >= len(args):
-                                error = "grep: option requires an argument -- 'A'"
-                                break
-                            try:
-                                after_context = int(args[i+1])
-                                if after_context < 0:
-                                    error = f"invalid number: {after_context}"
-                                i += 2
-                            except ValueError:
-                                error = f"grep: invalid number of lines after context: '{args[i+1]}'"
-                                break
-                        elif arg.startswith('-'):
-                            error = f"Invalid option: {arg}"
-                            break
-                        else:
-                            if pattern is None:
-                                pattern = arg
-                            else:
-                                filename = arg
-                            i += 1
-
-                    if error:
-                        return ("", error, 1)
-                    if not pattern:
-                        return ("", "grep: missing pattern", 1)
-                    try:
-                        regex_pattern = r'\b{}\b'.format(pattern) if word_boundary else pattern
-                        flags = re.IGNORECASE if case_insensitive else 0
-                        regex = re.compile(regex_pattern, flags)
-                    except re.error as e:
-                        return ("", f"grep: invalid regex: {e}", 1)
-
-                    file_content: list = []
-                    if filename:
-                        try:
-                            with open(filename, 'r') as f:
-                                file_content = f.read().splitlines()
-                        except Exception as e:
-                            return ("", f"grep: {e}", 1)
-                    elif stdin_data:
-                        file_content = stdin_data.split('\n')
-                    else:
-                        return ("", "grep: no input source", 1)
-
-                    output = []
-                    last_printed = -1
-                    for idx, line in enumerate(file_content):
-                        line = line.rstrip('\n')
-                        if regex.search(line):
-                            start = max(idx, last_printed + 1)
-                            end = idx + after_context + 1
-                            for j in range(start, min(end, len(file_content))):
-                                if j > last_printed:
-                                    output_line = file_content[j].rstrip('\n')
-                                    prefix = ""
-                                    output.append(f"{prefix}{output_line}")
-                                    last_printed = j
-
-                    print('\n'.join(output))
-                    return (stdout_buf.getvalue(), stderr_buf.getvalue(), code)
-
-            except Exception as e:
-                print(str(e), file=sys.stderr)
-                code = 1
-
-        return (stdout_buf.getvalue(), stderr_buf.getvalue(), code)
+        code = self.execute_builtin_stream(command, stdin, stdout_buf, stderr_buf)
+        return (self.decode(stdout_buf.getvalue()), stderr_buf.getvalue(), code)
+
+    def execute_builtin_stream(self,
+                               command: Command,
+                               stdin: Optional[BinaryIO],
+                               stdout: BinaryIO,
+                               stderr: TextIO,
+                               stage_stats: Optional[StageStats] = None) -> int:
+        handler = self.builtin(command.name)
+        if handler is None:
+            print(f"{command.name}: unknown builtin", file=stderr)
+            return 1
+        if self.stats is not None or stage_stats is not None:
+            def run(stdin: Any, stdout: Any) -> int:
+                return self._run_builtin(handler, command, stdin, stdout, stderr)
+            return self._profile_builtin(command.name, 'builtin', run, stdin, stdout, stage_stats)
+        return self._run_builtin(handler, command, stdin, stdout, stderr)
+
+    def execute_fused_stream(self,
+                             commands: Sequence[Command],
+                             stdin: Optional[BinaryIO],
+                             stdout: BinaryIO,
+                             stderr: TextIO,
+                             stage_stats: Optional[StageStats] = None) -> int:
+        handlers: List[BuiltinCommand] = []
+        for command in commands:
+            handler = self.builtin(command.name)
+            if handler is None:
+                print(f"{command.name}: unknown builtin", file=stderr)
+                return 1
+            handlers.append(handler)
+        if self.stats is not None or stage_stats is not None:
+            def run(stdin: Any, stdout: Any) -> int:
+                return self._run_fused(handlers, commands, stdin, stdout, stderr)
+            name = '|'.join(command.name for command in commands)
+            return self._profile_builtin(name, 'fused', run, stdin, stdout, stage_stats)
+        return self._run_fused(handlers, commands, stdin, stdout, stderr)
+
+    def builtin(self, name: str) -> Optional[BuiltinCommand]:
+        handler = self._builtins.get(name)
+        if handler is None:
+            handler_cls = BUILTINS.get(name)
+            if handler_cls is None:
+                return None
+            handler = self._builtins[name] = handler_cls(self)
+        return handler
+
+    def _profile_builtin(self, name: str, kind: str,
+                         run: Callable[[Optional[BinaryIO], BinaryIO], int],
+                         stdin: Optional[BinaryIO], stdout: BinaryIO,
+                         stage_stats: Optional[StageStats]) -> int:
+        if stage_stats is None:
+            assert self.stats is not None
+            stage_stats = StageStats(name, kind)
+            self.stats.stages.append(stage_stats)
+        counted_in: Any = CountingReader(stdin, stage_stats) if stdin is not None else None
+        counted_out: Any = CountingWriter(stdout, stage_stats)
+        cpu = time.thread_time()
+        try:
+            return run(counted_in, counted_out)
+        finally:
+            stage_stats.finish((time.thread_time() - cpu) * 1000)
+
+    def _run_builtin(self, handler: BuiltinCommand, command: Command,
+                     stdin: Optional[BinaryIO], stdout: BinaryIO, stderr: TextIO) -> int:
+        try:
+            if command.redirects:
+                with builtin_streams(command.redirects, stdin, stdout, stderr,
+                                     self.encoding, self.errors) as streams:
+                    return handler.run(list(command.args), *streams)
+            return handler.run(list(command.args), stdin, stdout, stderr)
+        except BrokenPipeError:
+            raise
+        except Exception as e:
+            print(str(e), file=stderr)
+            return 1
+
+    def _run_fused(self, handlers: List[BuiltinCommand], commands: Sequence[Command],
+                   stdin: Optional[BinaryIO], stdout: BinaryIO, stderr: TextIO) -> int:
+        codes = [0] * len(commands)
+        chunks: Optional[Iterator[bytes]] = BuiltinCommand.read_chunks(stdin) if stdin is not None else None
+        stages: List[Generator[bytes, None, None]] = []
+        try:
+            for i, (handler, command) in enumerate(zip(handlers, commands)):
+                chunks = self._fused_stage(handler.stream(list(command.args), chunks, stderr), codes, i)
+                stages.append(chunks)
+            for chunk in stages[-1]:
+                stdout.write(chunk)
+        except BrokenPipeError:
+            raise
+        except Exception as e:
+            print(str(e), file=stderr)
+            return 1
+        finally:
+            for stage in reversed(stages):
+                stage.close()
+        exit_code = 0
+        for code in codes:
+            if code != 0:
+                exit_code = code
+        return exit_code
+
+    @staticmethod
+    def _fused_stage(stream: ChunkStream, codes: List[int], i: int) -> Generator[bytes, None, None]:
+        code = yield from stream
+        codes[i] = code or 0
 
     def _handle_assignment(self, command: Command):
         value = ' '.join(command.args) if command.args else ''
-        self.env.set_var(command.name, value)
+        self.env.set_var(command.name, value, export=None)
 
     def _execute_builtin(self, command: Command) -> int:
-        stdout, stderr, code = self._execute_builtin_capture(command, None)
-        if stdout:
-            print(stdout, end='')
-        if stderr:
-            print(stderr, end='', file=sys.stderr)
-        return code
-
-    def _execute_external(self, command: Command) -> int:
-        stdout, stderr, code = self._execute_external_capture(command, None)
-        if stdout:
-            print(stdout, end='')
-        if stderr:
-            print(stderr, end='', file=sys.stderr)
-        return code
+        stdout = self._stdout_sink()
+        try:
+            return self.execute_builtin_stream(command, None, cast(BinaryIO, stdout), sys.stderr)
+        finally:
+            stdout.close()
 
     FINISH = 256
-
-    def _exit(self, _: List[str]) -> int:
-        return ProcessManager.FINISH
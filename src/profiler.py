@@ -0,0 +1,238 @@
+import io
+import os
+import sys
+import time
+from collections import defaultdict
+from typing import IO, Any, Dict, List, Optional
+
+HISTOGRAM_WIDTH = 40
+
+
+def peak_rss_kb() -> Optional[int]:
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value, 3)
+
+
+class StageStats:
+    __slots__ = ('name', 'kind', 'start', 'spawn_ms', 'wall_ms', 'cpu_ms',
+                 'bytes_in', 'bytes_out', 'peak_buffer')
+
+    def __init__(self, name: str, kind: str):
+        self.name = name
+        self.kind = kind
+        self.start = time.perf_counter()
+        self.spawn_ms: Optional[float] = None
+        self.wall_ms: Optional[float] = None
+        self.cpu_ms: Optional[float] = None
+        self.bytes_in: Optional[int] = None
+        self.bytes_out: Optional[int] = None
+        self.peak_buffer: Optional[int] = None
+
+    def finish(self, cpu_ms: Optional[float] = None) -> None:
+        self.wall_ms = (time.perf_counter() - self.start) * 1000
+        self.cpu_ms = cpu_ms
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'kind': self.kind,
+            'spawn_ms': _round(self.spawn_ms),
+            'wall_ms': _round(self.wall_ms),
+            'cpu_ms': _round(self.cpu_ms),
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out,
+            'peak_buffer': self.peak_buffer,
+        }
+
+
+class CommandStats:
+    def __init__(self, text: str):
+        self.text = text
+        self.parse_ms = 0.0
+        self.expand_ms = 0.0
+        self.substitution_ms = 0.0
+        self.wall_ms = 0.0
+        self.cpu_ms = 0.0
+        self.bytes_out = 0
+        self.peak_buffer = 0
+        self.rss_kb: Optional[int] = None
+        self.code: Optional[int] = None
+        self.stages: List[StageStats] = []
+        self._start = 0.0
+        self._times: Optional[os.times_result] = None
+
+    def begin(self) -> None:
+        self._times = os.times()
+        self._start = time.perf_counter()
+
+    def end(self, code: Optional[int]) -> None:
+        self.wall_ms = (time.perf_counter() - self._start) * 1000
+        assert self._times is not None
+        times = os.times()
+        self.cpu_ms = sum(now - before for now, before in zip(times[:4], self._times[:4])) * 1000
+        self.rss_kb = peak_rss_kb()
+        self.code = code
+
+    def count_output(self, data) -> None:
+        size = len(data)
+        self.bytes_out += size
+        if size > self.peak_buffer:
+            self.peak_buffer = size
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'command': self.text,
+            'code': self.code,
+            'parse_ms': _round(self.parse_ms),
+            'expand_ms': _round(self.expand_ms),
+            'substitution_ms': _round(self.substitution_ms),
+            'wall_ms': _round(self.wall_ms),
+            'cpu_ms': _round(self.cpu_ms),
+            'bytes_out': self.bytes_out,
+            'peak_buffer': self.peak_buffer,
+            'rss_kb': self.rss_kb,
+            'stages': [stage.as_dict() for stage in self.stages],
+        }
+
+    def report(self) -> str:
+        lines = [f"parse {self.parse_ms:.3f} ms  expand {self.expand_ms:.3f} ms"
+                 f"  substitution {self.substitution_ms:.3f} ms  wall {self.wall_ms:.3f} ms"
+                 f"  cpu {self.cpu_ms:.3f} ms  out {self.bytes_out} B  peak buffer {self.peak_buffer} B"
+                 + (f"  rss {self.rss_kb} KB" if self.rss_kb is not None else '')]
+        for i, stage in enumerate(self.stages, 1):
+            fields = [f"{i} {stage.name} ({stage.kind})"]
+            for label, value, unit in (('spawn', stage.spawn_ms, 'ms'), ('wall', stage.wall_ms, 'ms'),
+                                       ('cpu', stage.cpu_ms, 'ms')):
+                if value is not None:
+                    fields.append(f"{label} {value:.3f} {unit}")
+            for label, size in (('in', stage.bytes_in), ('out', stage.bytes_out),
+                                ('peak buffer', stage.peak_buffer)):
+                if size is not None:
+                    fields.append(f"{label} {size} B")
+            lines.append('  ' + '  '.join(fields))
+        return '\n'.join(lines)
+
+
+class CountingReader:
+    def __init__(self, stream: IO[bytes], stats: StageStats):
+        self.stream = stream
+        self.stats = stats
+        stats.bytes_in = 0
+
+    def read(self, size: int = -1) -> bytes:
+        return self._count(self.stream.read(size))
+
+    def read1(self, size: int = -1) -> bytes:
+        return self._count(getattr(self.stream, 'read1', self.stream.read)(size))
+
+    def readinto(self, buffer: Any) -> int:
+        readinto = getattr(self.stream, 'readinto', None)
+        if readinto is None:
+            data = self.stream.read(len(buffer))
+            buffer[:len(data)] = data
+            n = len(data)
+        else:
+            n = readinto(buffer) or 0
+        self.stats.bytes_in = (self.stats.bytes_in or 0) + n
+        return n
+
+    def fileno(self) -> int:
+        raise io.UnsupportedOperation('fileno')
+
+    def _count(self, data: bytes) -> bytes:
+        self.stats.bytes_in = (self.stats.bytes_in or 0) + len(data)
+        return data
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.stream, name)
+
+
+class CountingWriter:
+    def __init__(self, stream: IO[bytes], stats: StageStats):
+        self.stream = stream
+        self.stats = stats
+        stats.bytes_out = 0
+        stats.peak_buffer = 0
+
+    def write(self, data) -> int:
+        size = len(data)
+        self.stats.bytes_out = (self.stats.bytes_out or 0) + size
+        if size > (self.stats.peak_buffer or 0):
+            self.stats.peak_buffer = size
+        return self.stream.write(data)
+
+    def fileno(self) -> int:
+        raise io.UnsupportedOperation('fileno')
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.stream, name)
+
+
+class Profiler:
+    def __init__(self, enabled: bool = False, trace_path: Optional[str] = None):
+        self.enabled = enabled or trace_path is not None
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.commands = 0
+        self._trace: Optional[IO[str]] = open(trace_path, 'a') if trace_path else None
+
+    def record(self, stats: CommandStats) -> None:
+        self.commands += 1
+        for metric in ('parse_ms', 'expand_ms', 'substitution_ms', 'wall_ms', 'cpu_ms',
+                       'bytes_out', 'peak_buffer'):
+            self.samples[metric].append(getattr(stats, metric))
+        if stats.rss_kb is not None:
+            self.samples['rss_kb'].append(stats.rss_kb)
+        for stage in stats.stages:
+            if stage.spawn_ms is not None:
+                self.samples['spawn_ms'].append(stage.spawn_ms)
+        if self._trace is not None:
+            import json
+
+            self._trace.write(json.dumps(stats.as_dict()) + '\n')
+            self._trace.flush()
+
+    def reset(self) -> None:
+        self.samples.clear()
+        self.commands = 0
+
+    def close(self) -> None:
+        if self._trace is not None:
+            self._trace.close()
+            self._trace = None
+
+    def summary(self) -> str:
+        lines = [f"commands: {self.commands}"]
+        for metric in sorted(self.samples):
+            values = sorted(self.samples[metric])
+            if not values:
+                continue
+            lines.append(f"{metric}: n={len(values)} p50={_percentile(values, 0.5):.3f}"
+                         f" p90={_percentile(values, 0.9):.3f} p99={_percentile(values, 0.99):.3f}"
+                         f" max={values[-1]:.3f}")
+            lines.extend(_histogram(values))
+        return '\n'.join(lines)
+
+
+def _percentile(values: List[float], q: float) -> float:
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def _histogram(values: List[float]) -> List[str]:
+    buckets: Dict[float, int] = defaultdict(int)
+    for value in values:
+        bound = 1.0
+        while value >= bound:
+            bound *= 2
+        buckets[bound] += 1
+    peak = max(buckets.values())
+    return [f"  <{bound:<12g}{'#' * max(1, count * HISTOGRAM_WIDTH // peak)} {count}"
+            for bound, count in sorted(buckets.items())]
@@ -0,0 +1,116 @@
+import contextlib
+import os
+from typing import Any, BinaryIO, Iterator, List, Optional, Sequence, TextIO, Tuple
+from command import Redirection
+
+FLAGS = {
+    '<': os.O_RDONLY,
+    '>': os.O_WRONLY | os.O_CREAT | os.O_TRUNC,
+    '>>': os.O_WRONLY | os.O_CREAT | os.O_APPEND,
+}
+MODES = {'<': 'rb', '>': 'wb', '>>': 'ab'}
+
+
+class _TextWriter:
+    def __init__(self, stream: TextIO, encoding: str, errors: str):
+        self.stream = stream
+        self.encoding = encoding
+        self.errors = errors
+
+    def write(self, data) -> int:
+        self.stream.write(bytes(data).decode(self.encoding, self.errors))
+        return len(data)
+
+    def flush(self) -> None:
+        self.stream.flush()
+
+
+class _BinaryWriter:
+    def __init__(self, stream: BinaryIO, encoding: str, errors: str):
+        self.stream = stream
+        self.encoding = encoding
+        self.errors = errors
+
+    def write(self, text: str) -> int:
+        self.stream.write(text.encode(self.encoding, self.errors))
+        return len(text)
+
+    def flush(self) -> None:
+        flush = getattr(self.stream, 'flush', None)
+        if flush is not None:
+            flush()
+
+
+def _check_fd(redirect: Redirection) -> None:
+    if redirect.fd not in (0, 1, 2):
+        raise ValueError(f"{redirect.fd}: bad file descriptor")
+
+
+def _source_fd(redirect: Redirection) -> int:
+    if redirect.target not in ('0', '1', '2'):
+        raise ValueError(f"{redirect.target}: bad file descriptor")
+    return int(redirect.target)
+
+
+def child_fds(redirects: Sequence[Redirection], fds: List[Any]) -> List[int]:
+    import subprocess
+
+    opened: List[int] = []
+    try:
+        for redirect in redirects:
+            _check_fd(redirect)
+            if redirect.op == '>&':
+                source = fds[_source_fd(redirect)]
+                if source == subprocess.PIPE:
+                    if redirect.fd != 2:
+                        # A captured stderr has no descriptor yet to point stdout at.
+                        raise ValueError(f"{redirect}: unsupported redirection")
+                    source = subprocess.STDOUT
+                fds[redirect.fd] = source
+                continue
+            try:
+                fd = os.open(redirect.target, FLAGS[redirect.op], 0o666)
+            except OSError as e:
+                raise ValueError(f"{redirect.target}: {e.strerror}")
+            opened.append(fd)
+            fds[redirect.fd] = fd
+    except BaseException:
+        for fd in opened:
+            os.close(fd)
+        raise
+    return opened
+
+
+@contextlib.contextmanager
+def builtin_streams(redirects: Sequence[Redirection],
+                    stdin: Optional[BinaryIO],
+                    stdout: BinaryIO,
+                    stderr: TextIO,
+                    encoding: str = 'utf-8',
+                    errors: str = 'replace') -> Iterator[Tuple[Optional[BinaryIO], BinaryIO, TextIO]]:
+    streams: List[Any] = [stdin, stdout, stderr]
+    with contextlib.ExitStack() as stack:
+        for redirect in redirects:
+            _check_fd(redirect)
+            if redirect.op == '>&':
+                source = _source_fd(redirect)
+                if source == redirect.fd:
+                    continue
+                if redirect.fd == 2 and source == 1:
+                    streams[2] = _BinaryWriter(streams[1], encoding, errors)
+                elif redirect.fd == 1 and source == 2:
+                    streams[1] = _TextWriter(streams[2], encoding, errors)
+                else:
+                    raise ValueError(f"{redirect}: unsupported redirection")
+                continue
+            mode = MODES[redirect.op]
+            try:
+                if redirect.fd == 2:
+                    stream = open(redirect.target, mode.replace('b', ''),
+                                  encoding=encoding, errors=errors)
+                else:
+                    stream = open(redirect.target, mode)
+            except OSError as e:
+                raise ValueError(f"{redirect.target}: {e.strerror}")
+            streams[redirect.fd] = stack.enter_context(stream)
+        yield streams[0], streams[1], streams[2]
@@ -0,0 +1,172 @@
+from environment_manager import EnvironmentManager
+from command_parser import CommandParser
+from process_manager import ProcessManager
+from profiler import CommandStats, Profiler
+from typing import Iterable, List, Optional
+import codecs
+import sys
+import os
+import time
+
+SCRIPT_BUFFER_SIZE = 1 << 20
+PROFILE_PREFIXES = ('profile ', 'profile\t')
+USAGE = ("usage: interpreter.py [-e] [--encoding ENCODING] [--errors ERRORS]"
+         " [--profile] [--trace FILE] [-c COMMAND | SCRIPT]")
+
+
+class Interpreter:
+    def __init__(self, encoding: str = 'utf-8', errors: str = 'replace'):
+        self.env = EnvironmentManager()
+        self.process_manager = ProcessManager(self.env, encoding=encoding, errors=errors)
+        self.parser = CommandParser(self.env, self.process_manager)
+        self.should_exit = False
+
+    def run(self):
+        while not self.should_exit:
+            try:
+                for job in self.process_manager.jobs.reap():
+                    print(job)
+                self._print_prompt()
+                exit_code = self.execute_line(input())
+                if exit_code == ProcessManager.FINISH:
+                    self.should_exit = True
+            except (KeyboardInterrupt, EOFError):
+                print("\nExiting...")
+                break
+            except Exception as e:
+                print(f"Error: {e}", file=sys.stderr)
+
+    def run_script(self, lines: Iterable[str], fail_fast: bool = False) -> int:
+        execute_line = self.execute_line
+        self.process_manager.autoflush = False
+        exit_code = 0
+        try:
+            for line in lines:
+                try:
+                    code = execute_line(line)
+                    if code is None:
+                        continue
+                except Exception as e:
+                    sys.stdout.flush()
+                    print(f"Error: {e}", file=sys.stderr)
+                    code = 1
+                if code == ProcessManager.FINISH:
+                    break
+                exit_code = code
+                if fail_fast and code != 0:
+                    break
+        finally:
+            self.process_manager.autoflush = True
+            sys.stdout.flush()
+        return exit_code
+
+    def execute_line(self, line: str) -> Optional[int]:
+        stripped = line.lstrip()
+        if stripped.startswith(PROFILE_PREFIXES):
+            return self._execute_profiled(stripped[len(PROFILE_PREFIXES[0]):], report=True)
+        profiler = self.process_manager.profiler
+        if profiler is not None and profiler.enabled:
+            return self._execute_profiled(line, report=False)
+        command = self.parser.parse(line)
+        if command is None:
+            return None
+        return self.process_manager.execute(command)
+
+    def _execute_profiled(self, line: str, report: bool) -> Optional[int]:
+        pm = self.process_manager
+        if pm.profiler is None:
+            pm.profiler = Profiler()
+        stats = CommandStats(line.strip())
+        start = time.perf_counter()
+        tree = self.parser.parse_tree(line)
+        stats.parse_ms = (time.perf_counter() - start) * 1000
+        if tree is None:
+            return None
+        pm.stats = stats
+        try:
+            start = time.perf_counter()
+            command = self.parser.expand(tree)
+            stats.expand_ms = (time.perf_counter() - start) * 1000 - stats.substitution_ms
+            stats.begin()
+            code = pm.execute(command)
+            stats.end(code)
+        finally:
+            pm.stats = None
+        pm.profiler.record(stats)
+        if report:
+            sys.stdout.flush()
+            print(stats.report(), file=sys.stderr)
+        return code
+
+    def _print_prompt(self):
+        pwd = self.env.get("PWD", os.getcwd())
+        print(f"{pwd} > ", end='', flush=True)
+
+
+def main(argv: List[str]) -> int:
+    fail_fast = False
+    encoding = 'utf-8'
+    errors = 'replace'
+    profile = False
+    trace: Optional[str] = None
+    command: Optional[str] = None
+    script: Optional[str] = None
+    while argv:
+        arg = argv.pop(0)
+        if arg == '-e':
+            fail_fast = True
+        elif arg == '--encoding' and argv:
+            encoding = argv.pop(0)
+        elif arg == '--errors' and argv:
+            errors = argv.pop(0)
+        elif arg == '--profile':
+            profile = True
+        elif arg == '--trace' and argv:
+            trace = argv.pop(0)
+        elif arg == '-c' and argv:
+            command = argv.pop(0)
+            break
+        elif arg.startswith('-') and arg != '-':
+            print(USAGE, file=sys.stderr)
+            return 2
+        else:
+            script = arg
+            break
+
+    try:
+        codecs.lookup(encoding)
+        codecs.lookup_error(errors)
+    except LookupError as e:
+        print(f"interpreter.py: {e}", file=sys.stderr)
+        return 2
+
+    interpreter = Interpreter(encoding, errors)
+    if profile or trace is not None:
+        try:
+            interpreter.process_manager.profiler = Profiler(profile, trace)
+        except OSError as e:
+            print(f"{trace}: {e.strerror}", file=sys.stderr)
+            return 2
+    try:
+        return _run(interpreter, command, script, fail_fast)
+    finally:
+        if interpreter.process_manager.profiler is not None:
+            interpreter.process_manager.profiler.close()
+
+
+def _run(interpreter: Interpreter, command: Optional[str], script: Optional[str],
+         fail_fast: bool) -> int:
+    if command is not None:
+        return interpreter.run_script(command.splitlines(), fail_fast)
+    if script is not None and script != '-':
+        try:
+            f = open(script, buffering=SCRIPT_BUFFER_SIZE)
+        except OSError as e:
+            print(f"{script}: {e.strerror}", file=sys.stderr)
+            return 127
+        with f:
+            return interpreter.run_script(f, fail_fast)
+    if script == '-' or not sys.stdin.isatty():
+        return interpreter.run_script(sys.stdin, fail_fast)
+    interpreter.run()
+    return 0
@@ -0,0 +1,44 @@
+from typing import NamedTuple, Tuple, Union
+
+
+class Literal(NamedTuple):
+    text: str
+
+
+class Var(NamedTuple):
+    name: str
+
+
+class CommandSub(NamedTuple):
+    source: str
+
+
+WordPart = Union[Literal, Var, CommandSub]
+
+
+class Word(NamedTuple):
+    parts: Tuple[WordPart, ...]
+
+
+class Redirect(NamedTuple):
+    fd: int
+    op: str
+    target: Word
+
+
+class SimpleCommand(NamedTuple):
+    words: Tuple[Word, ...]
+    redirects: Tuple[Redirect, ...] = ()
+
+
+class PipelineNode(NamedTuple):
+    commands: Tuple[SimpleCommand, ...]
+    background: bool = False
+
+
+class AssignmentNode(NamedTuple):
+    name: str
+    words: Tuple[Word, ...]
+
+
+Tree = Union[PipelineNode, AssignmentNode]
@@ -0,0 +1,86 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import asyncio
+import tempfile
+import unittest
+from async_process_manager import AsyncProcessManager
+from command_parser import CommandParser
+from environment_manager import EnvironmentManager
+from unittest.mock import patch
+from io import StringIO
+
+
+class TestAsyncProcessManager(unittest.TestCase):
+    def setUp(self):
+        self.env = EnvironmentManager()
+        self.manager = AsyncProcessManager(self.env)
+        self.parser = CommandParser(self.env, self.manager.process_manager)
+
+    def capture(self, command_line, stdin_data=None):
+        command = self.parser.parse(command_line)
+        return asyncio.run(self.manager.execute_capture(command, stdin_data))
+
+    def test_builtin_and_external_stages(self):
+        self.assertEqual(self.capture('echo hello world | wc'), ('1 2 12\n', '', 0))
+        stdout, _, code = self.capture('seq 1000 | grep 99 | wc -l')
+        self.assertEqual((stdout, code), ('19\n', 0))
+
+    def test_stdin_data(self):
+        self.assertEqual(self.capture('tr a b', 'aaa\n'), ('bbb\n', '', 0))
+        self.assertEqual(self.capture('grep x', 'a\nx\n'), ('x\n', '', 0))
+
+    def test_errors(self):
+        stdout, stderr, code = self.capture('no_such_command_12345 | wc -l')
+        self.assertEqual(code, 127)
+        self.assertIn('command not found', stderr)
+        stdout, stderr, code = self.capture('ls /nonexistent_dir_12345')
+        self.assertNotEqual(code, 0)
+        self.assertTrue(stderr)
+
+    def test_large_stderr(self):
+        command = self.parser.parse('python3 -c "import sys; sys.stderr.write(\'x\' * 300000); print(\'ok\')"')
+
+        async def run():
+            return await asyncio.wait_for(self.manager.execute_capture(command), 10)
+
+        stdout, stderr, code = asyncio.run(run())
+        self.assertEqual((stdout, len(stderr), code), ('ok\n', 300000, 0))
+
+    def test_more_builtin_stages_than_executor_workers(self):
+        with tempfile.NamedTemporaryFile('w') as f:
+            f.write(''.join(f'line {i}\n' for i in range(200000)))
+            f.flush()
+            greps = ' | '.join(['grep line'] * ((os.cpu_count() or 1) + 6))
+            command = self.parser.parse(f'cat {f.name} | {greps} | wc -l')
+
+            async def run():
+                return await asyncio.wait_for(self.manager.execute_capture(command), 60)
+
+            self.assertEqual(asyncio.run(run()), ('200000\n', '', 0))
+
+    def test_execute_and_assignment(self):
+        with patch('sys.stdout', new=StringIO()) as fake_out:
+            asyncio.run(self.manager.execute(self.parser.parse('A=value')))
+            code = asyncio.run(self.manager.execute(self.parser.parse('echo $A | grep v')))
+        self.assertEqual(fake_out.getvalue(), 'value\n')
+        self.assertEqual(code, 0)
+
+    def test_pipelines_run_concurrently(self):
+        # The first pipeline only prints once the last one has run.
+        with tempfile.TemporaryDirectory() as tmp:
+            flag = os.path.join(tmp, 'flag')
+            lines = [f"sh -c 'i=0; until [ -e {flag} ] || [ $i -ge 1000 ]; do sleep 0.01; i=$((i+1)); done;"
+                     f" [ -e {flag} ] && echo a' | wc -c",
+                     'sleep 0.1 | wc -c', 'sleep 0.1 | wc -c', f"sh -c 'touch {flag}' | wc -c"]
+            commands = [self.parser.parse(line) for line in lines]
+
+            async def run_all():
+                return await asyncio.gather(*(self.manager.execute_capture(c) for c in commands))
+
+            results = asyncio.run(run_all())
+        self.assertEqual(results, [('2\n', '', 0)] + [('0\n', '', 0)] * 3)
+
+if __name__ == '__main__':
+    unittest.main()
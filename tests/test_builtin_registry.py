@@ -0,0 +1,89 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import tempfile
+import unittest
+from unittest.mock import patch
+from io import StringIO
+from builtin_registry import BUILTINS, BuiltinCommand, BuiltinRegistry
+from command import CommandType
+from command_parser import CommandParser
+from process_manager import ProcessManager
+from environment_manager import EnvironmentManager
+
+
+class Shout(BuiltinCommand):
+    name = 'shout'
+
+    def run(self, args, stdin, stdout, stderr):
+        stdout.write((' '.join(args).upper() + '\n').encode())
+        return 0
+
+
+class TestBuiltinRegistry(unittest.TestCase):
+    def setUp(self):
+        self.env = EnvironmentManager()
+        self.process_manager = ProcessManager(self.env)
+        self.parser = CommandParser(self.env, self.process_manager)
+
+    def tearDown(self):
+        BUILTINS.unregister('shout')
+
+    def test_default_builtins_registered(self):
+        for name in ('cat', 'echo', 'wc', 'pwd', 'exit', 'grep'):
+            self.assertIn(name, BUILTINS)
+        self.assertNotIn('ls', BUILTINS)
+
+    def test_lazy_module_loading(self):
+        registry = BuiltinRegistry()
+        registry.register('echo', 'builtin_commands.echo:Echo')
+        sys.modules.pop('builtin_commands.echo', None)
+        self.assertIn('echo', registry)
+        self.assertNotIn('builtin_commands.echo', sys.modules)
+        self.assertEqual(registry.get('echo').name, 'echo')
+        self.assertIn('builtin_commands.echo', sys.modules)
+
+    def test_third_party_builtin(self):
+        BUILTINS.register('shout', Shout)
+        pipeline = self.parser.parse('shout hello | cat')
+        self.assertEqual(pipeline.commands[0].type, CommandType.BUILTIN)
+        with patch('sys.stdout', new=StringIO()) as fake_out:
+            code = self.process_manager.execute(self.parser.parse('shout hello'))
+        self.assertEqual(fake_out.getvalue(), "HELLO\n")
+        self.assertEqual(code, 0)
+
+    def test_entry_points(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            dist = os.path.join(tmp, 'shout_plugin-1.0.dist-info')
+            os.mkdir(dist)
+            with open(os.path.join(dist, 'entry_points.txt'), 'w') as f:
+                f.write("[console_scripts]\nloud = shout_plugin:main\n\n"
+                        "[sd_cli.builtins]\nshout = builtin_commands.pwd:Pwd\n"
+                        "echo = shout_plugin:Echo\n")
+            with patch('sys.path', [tmp] + sys.path):
+                registry = BuiltinRegistry()
+                registry.register('echo', 'builtin_commands.echo:Echo')
+                self.assertIn('shout', registry)
+                self.assertNotIn('loud', registry)
+                self.assertEqual(registry.get('shout').__name__, 'Pwd')
+                self.assertEqual(registry.get('echo').__name__, 'Echo')
+                self.assertEqual(registry.get('echo').__module__, 'builtin_commands.echo')
+
+    def test_entry_points_in_zipped_eggs_are_not_scanned(self):
+        import zipfile
+
+        with tempfile.TemporaryDirectory() as tmp:
+            egg = os.path.join(tmp, 'shout_plugin-1.0.egg')
+            with zipfile.ZipFile(egg, 'w') as z:
+                z.writestr('EGG-INFO/entry_points.txt',
+                           "[sd_cli.builtins]\nshout = builtin_commands.pwd:Pwd\n")
+            with patch('sys.path', [egg] + sys.path):
+                registry = BuiltinRegistry()
+                self.assertNotIn('shout', registry)
+                registry.register('shout', 'builtin_commands.pwd:Pwd')
+                self.assertIn('shout', registry)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -8,7 +8,7 @@ from command_parser import CommandParser
 from process_manager import ProcessManager
 from environment_manager import EnvironmentManager
 from unittest.mock import patch
-from io import StringIO
+from io import BytesIO, StringIO
 
 class TestCat(unittest.TestCase):
     def setUp(self):
@@ -38,6 +38,50 @@ class TestCat(unittest.TestCase):
             self.assertEqual(code, 0)
         os.unlink(f.name)
 
+    def test_cat_is_byte_exact(self):
+        data = bytes(range(256)) * 1000
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            f.write(data)
+        command = self.parser.parse(f'cat {f.name}')
+        stdout = BytesIO()
+        code = self.process_manager.execute_builtin_stream(
+            command, None, stdout, StringIO())
+        self.assertEqual(stdout.getvalue(), data)
+        self.assertEqual(code, 0)
+        os.unlink(f.name)
+
+    def test_cat_many_files_and_stdin(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            first, second = os.path.join(tmp, 'a'), os.path.join(tmp, 'b')
+            for path, data in ((first, b'one\n'), (second, b'two')):
+                with open(path, 'wb') as f:
+                    f.write(data)
+            stdout, _, code = self.execute_command(f'cat {first} {second}')
+            self.assertEqual((stdout, code), ('one\ntwo', 0))
+            stdout, _, _ = self.execute_command(f'echo piped | cat {first} - {second}')
+            self.assertEqual(stdout, 'one\npiped\ntwo')
+            stdout, stderr, code = self.execute_command(f'cat {first} missing.txt {second}')
+            self.assertEqual(stdout, 'one\ntwo')
+            self.assertIn('missing.txt', stderr)
+            self.assertEqual(code, 1)
+            _, stderr, code = self.execute_command('cat')
+            self.assertEqual((stderr, code), ('cat: no input source', 1))
+
+    def test_cat_to_real_fds(self):
+        data = os.urandom(3 * 1024 * 1024)
+        with tempfile.TemporaryDirectory() as tmp:
+            src, dst = os.path.join(tmp, 'src'), os.path.join(tmp, 'dst')
+            with open(src, 'wb') as f:
+                f.write(data)
+            with patch('os.sendfile', wraps=os.sendfile) as sendfile:
+                self.execute_command(f'cat {src} {src} > {dst}')
+            self.assertTrue(sendfile.called)
+            with open(dst, 'rb') as f:
+                self.assertEqual(f.read(), data * 2)
+            self.execute_command(f'cat {src} | cat | cat > {dst}')
+            with open(dst, 'rb') as f:
+                self.assertEqual(f.read(), data)
+
     def test_cat_nonexistent(self):
         stdout, stderr, code = self.execute_command('cat missing.txt')
         self.assertIn('Errno', stderr)
@@ -0,0 +1,63 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import shutil
+import tempfile
+import unittest
+from command_parser import CommandParser
+from process_manager import ProcessManager
+from environment_manager import EnvironmentManager
+from unittest.mock import patch
+from io import StringIO
+
+
+class TestCommandHash(unittest.TestCase):
+    def setUp(self):
+        self.env = EnvironmentManager()
+        self.process_manager = ProcessManager(self.env)
+        self.parser = CommandParser(self.env, self.process_manager)
+        self.table = self.process_manager.command_hash
+
+    def execute_command(self, command_line):
+        command = self.parser.parse(command_line)
+        with patch('sys.stdout', new=StringIO()) as fake_out, \
+             patch('sys.stderr', new=StringIO()) as fake_err:
+            exit_code = self.process_manager.execute(command)
+            return fake_out.getvalue(), fake_err.getvalue(), exit_code
+
+    def test_lookup_is_cached(self):
+        with patch('shutil.which', wraps=shutil.which) as which:
+            for _ in range(3):
+                self.assertEqual(self.execute_command('true')[2], 0)
+            self.assertEqual(which.call_count, 1)
+        self.assertEqual(self.table.items(), [('true', shutil.which('true'), 3)])
+
+    def test_path_change_invalidates(self):
+        self.table.lookup('true')
+        with tempfile.TemporaryDirectory() as tmp:
+            self.env.set_var('PATH', tmp)
+            self.assertEqual(self.table.items(), [])
+            self.assertIsNone(self.table.lookup('true'))
+
+    def test_missing_command_is_not_spawned(self):
+        with patch('subprocess.Popen') as popen:
+            _, err, code = self.execute_command('no_such_command_12345 | wc')
+        popen.assert_not_called()
+        self.assertEqual(code, 127)
+        self.assertIn('no_such_command_12345: command not found', err)
+
+    def test_hash_builtin(self):
+        self.assertEqual(self.execute_command('hash'), ('', '', 0))
+        self.assertEqual(self.execute_command('hash ls')[2], 0)
+        output, _, code = self.execute_command('hash')
+        self.assertEqual(output, f"hits\tcommand\n   0\t{shutil.which('ls')}\n")
+        _, err, code = self.execute_command('hash no_such_command_12345')
+        self.assertEqual(code, 1)
+        self.assertIn('not found', err)
+        self.execute_command('hash -r')
+        self.assertEqual(self.table.items(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -45,6 +45,55 @@ class TestEnvironment(unittest.TestCase):
         stdout, _, _ = self.execute_command('echo $UNDEFINED_VAR')
         self.assertEqual(stdout, "")
 
+    def test_assignment_is_not_exported(self):
+        self.execute_command('MY_VAR=hidden')
+        self.assertNotIn('MY_VAR', self.env.get_environment())
+        stdout, _, code = self.execute_command('printenv MY_VAR')
+        self.assertEqual((stdout, code), ('', 1))
+        self.execute_command('export MY_VAR')
+        stdout, _, _ = self.execute_command('printenv MY_VAR')
+        self.assertEqual(stdout, 'hidden')
+        self.execute_command('MY_VAR=changed')
+        self.assertEqual(self.env.get_environment()['MY_VAR'], 'changed')
+
+    def test_export_builtin(self):
+        _, _, code = self.execute_command('export A=1 B="x y"')
+        self.assertEqual(code, 0)
+        stdout, _, _ = self.execute_command('export')
+        self.assertIn("export A=1", stdout)
+        self.assertIn("export B='x y'", stdout)
+        _, err, code = self.execute_command('export 1A=2')
+        self.assertEqual(code, 1)
+
+    def test_environment_is_cached(self):
+        first = self.env.get_environment()
+        self.assertIs(self.env.get_environment(), first)
+        version = self.env.version
+        self.env.set_var('HOME', self.env.get('HOME'))
+        self.assertEqual(self.env.version, version)
+        self.assertIs(self.env.get_environment(), first)
+        self.env.set_var('CACHED', 'value')
+        self.assertIsNot(self.env.get_environment(), first)
+        self.assertEqual(self.env.get_environment()['CACHED'], 'value')
+
+    def test_overlay(self):
+        self.env.set_var('A', 'parent')
+        overlay = self.env.overlay()
+        self.assertIs(overlay.get_environment(), self.env.get_environment())
+        overlay.set_var('A', 'child')
+        overlay.set_var('B', 'child')
+        overlay.unset_var('HOME')
+        self.assertEqual(overlay.get('A'), 'child')
+        self.assertEqual(overlay.get('HOME', 'unset'), 'unset')
+        self.assertNotIn('HOME', overlay.get_environment())
+        self.assertEqual(self.env.get('A'), 'parent')
+        self.assertEqual(self.env.get('B', 'unset'), 'unset')
+
+    def test_substitution_runs_in_overlay(self):
+        stdout, _, _ = self.execute_command('echo $(LEAK=1)$LEAK')
+        self.assertEqual(stdout, '')
+        self.assertEqual(self.env.get('LEAK', 'unset'), 'unset')
+
 
 if __name__ == '__main__':
     unittest.main()
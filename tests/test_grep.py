@@ -4,9 +4,12 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..',
 
 import unittest
 import tempfile
+from io import BytesIO, StringIO
+from unittest.mock import patch
 from process_manager import ProcessManager
 from command import Command, CommandType, CommandFactory
 from environment_manager import EnvironmentManager
+from builtin_commands.grep import get_matcher, matcher_cache_info, required_literal
 
 class TestGrepCommand(unittest.TestCase):
     def setUp(self):
@@ -94,5 +97,117 @@ Unicode: Привет Мір
         stdout, stderr, code = self._run_grep(['-A', '-5', 'test', self.temp_file.name])
         self.assertIn("invalid number", stderr.lower())
 
+    def test_no_match_exit_code(self):
+        stdout, stderr, code = self._run_grep(['absent', self.temp_file.name])
+        self.assertEqual(stdout, "")
+        self.assertEqual(code, 1)
+
+    def test_count_and_invert(self):
+        stdout, _, _ = self._run_grep(['-c', '-i', 'test', self.temp_file.name])
+        self.assertEqual(stdout, "2\n")
+        stdout, _, _ = self._run_grep(['-vc', 'i', self.temp_file.name])
+        self.assertEqual(stdout, "2\n")
+
+    def test_line_numbers_and_context(self):
+        stdout, _, _ = self._run_grep(['-n', '-A', '1', 'Another', self.temp_file.name])
+        self.assertEqual(stdout, "3:Another TEST\n4-Line with numbers 123\n")
+
+    def test_max_count_stops_reading(self):
+        class Source(BytesIO):
+            reads = 0
+
+            def read1(self, size=-1):
+                Source.reads += 1
+                return super().read1(size)
+
+        source = Source(b"match\n" * 1000)
+        cmd = CommandFactory.create(CommandType.BUILTIN, 'grep', ['-m', '2', 'match'])
+        stdout = BytesIO()
+        with patch('builtin_commands.grep.READ_SIZE', 60):
+            code = self.process_manager.execute_builtin_stream(cmd, source, stdout, StringIO())
+        self.assertEqual(stdout.getvalue(), b"match\nmatch\n")
+        self.assertEqual(code, 0)
+        self.assertEqual(Source.reads, 1)
+
+    def test_context_across_chunks(self):
+        data = b"skip\nhit\n" + b"".join(b"after%d\n" % i for i in range(5))
+        cmd = CommandFactory.create(CommandType.BUILTIN, 'grep', ['-A', '3', 'hit'])
+        stdout = BytesIO()
+        with patch('builtin_commands.grep.READ_SIZE', 4):
+            self.process_manager.execute_builtin_stream(cmd, BytesIO(data), stdout, StringIO())
+        self.assertEqual(stdout.getvalue(), b"hit\nafter0\nafter1\nafter2\n")
+
+    def test_multiple_files_and_recursive(self):
+        with tempfile.TemporaryDirectory() as root:
+            os.mkdir(os.path.join(root, 'sub'))
+            for name, text in (('a.log', 'x ERROR 1\nok\n'), ('sub/b.log', 'ERROR 2\n')):
+                with open(os.path.join(root, name), 'w') as f:
+                    f.write(text)
+            first = os.path.join(root, 'a.log')
+            second = os.path.join(root, 'sub', 'b.log')
+            stdout, _, code = self._run_grep(['ERROR', first, second])
+            self.assertEqual(stdout, f"{first}:x ERROR 1\n{second}:ERROR 2\n")
+            stdout, _, _ = self._run_grep(['-r', '-l', 'ERROR', root])
+            self.assertEqual(stdout, f"{first}\n{second}\n")
+            stdout, stderr, code = self._run_grep(['ERROR', root])
+            self.assertIn("Is a directory", stderr)
+
+    def test_parallel_matches_sequential(self):
+        with tempfile.TemporaryDirectory() as root:
+            paths = []
+            for i in range(4):
+                path = os.path.join(root, f'{i}.log')
+                with open(path, 'w') as f:
+                    f.write(''.join(f'line {n} {"ERROR" if n % 7 == 0 else "ok"}\n'
+                                    for n in range(i * 500)))
+                paths.append(path)
+            for flags in ([], ['-c'], ['-v', '-l']):
+                sequential = self._run_grep(flags + ['ERROR'] + paths)
+                with patch('builtin_commands.grep.RANGE_SIZE', 1000):
+                    parallel = self._run_grep(['-j', '3'] + flags + ['ERROR'] + paths)
+                self.assertEqual(parallel, sequential)
+
+    def test_jobs_from_environment(self):
+        self.env.set_var('GREP_JOBS', '2')
+        with patch('builtin_commands.grep.Grep._run_parallel',
+                   return_value=(1, False)) as run_parallel:
+            self._run_grep(['Hello', self.temp_file.name, self.temp_file.name])
+        self.assertEqual(run_parallel.call_args[0][1].jobs, 2)
+
+    def test_matcher_cache(self):
+        get_matcher.cache_clear()
+        for _ in range(3):
+            self._run_grep(['-w', 'Test', self.temp_file.name])
+        self._run_grep(['-i', 'Test', self.temp_file.name])
+        info = matcher_cache_info()
+        self.assertEqual((info.hits, info.misses), (2, 2))
+
+    def test_required_literal(self):
+        self.assertEqual(required_literal('ERR.R'), 'ERR')
+        self.assertEqual(required_literal(r'\.conf$'), '.conf')
+        self.assertEqual(required_literal('ab*cde'), 'cde')
+        self.assertEqual(required_literal('x[ab]y'), 'x')
+        self.assertEqual(required_literal('foo|bar'), '')
+        self.assertEqual(required_literal('x{3}'), '')
+        self.assertEqual(required_literal('ab{2}c'), 'a')
+        self.assertEqual(required_literal(r'\d{12}'), '')
+        self.assertEqual(required_literal('id{2,3}ab'), 'ab')
+
+    def test_max_count_zero_prints_no_context(self):
+        output, _, code = self._run_grep(['-A', '2', '-m', '0', 'a'], 'a\nb\nc\n')
+        self.assertEqual((output, code), ('', 1))
+
+    def test_grep_bounded_repetition(self):
+        output, _, code = self._run_grep(['x{3}'], 'ab\nxxx\n')
+        self.assertEqual((output, code), ('xxx\n', 0))
+        output, _, code = self._run_grep([r'\d{3}'], 'id 12\nid 123\n')
+        self.assertEqual((output, code), ('id 123\n', 0))
+
+    def test_prefilter_skips_buffer_without_literal(self):
+        matcher = get_matcher('ERR.R')
+        self.assertEqual(list(matcher.lines(b"INFO ok\nWARN no\n")), [])
+        self.assertEqual(list(matcher.lines(b"INFO ok\nERROR x\n")), [(8, 16)])
+
+
 if __name__ == '__main__':
     unittest.main()
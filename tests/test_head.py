@@ -0,0 +1,75 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import unittest
+import tempfile
+from command_parser import CommandParser
+from process_manager import ProcessManager
+from environment_manager import EnvironmentManager
+from unittest.mock import patch
+from io import StringIO
+from builtin_commands.head import head_chunks, parse_count_args
+
+
+class TestHead(unittest.TestCase):
+    def setUp(self):
+        self.env = EnvironmentManager()
+        self.process_manager = ProcessManager(self.env)
+        self.parser = CommandParser(self.env, self.process_manager)
+
+    def execute_command(self, command_line):
+        command = self.parser.parse(command_line)
+        with patch('sys.stdout', new=StringIO()) as fake_out, \
+             patch('sys.stderr', new=StringIO()) as fake_err:
+            exit_code = self.process_manager.execute(command)
+            return fake_out.getvalue(), fake_err.getvalue(), exit_code
+
+    def test_parse_count_args(self):
+        self.assertEqual(parse_count_args('head', []), (True, 10, []))
+        self.assertEqual(parse_count_args('head', ['-n', '3', 'f']), (True, 3, ['f']))
+        self.assertEqual(parse_count_args('head', ['-c5']), (False, 5, []))
+        self.assertEqual(parse_count_args('head', ['-7', 'a', 'b']), (True, 7, ['a', 'b']))
+        with self.assertRaises(ValueError):
+            parse_count_args('head', ['-n', 'x'])
+        with self.assertRaises(ValueError):
+            parse_count_args('head', ['-q'])
+
+    def test_head_chunks_stops_reading(self):
+        consumed = []
+
+        def chunks():
+            for chunk in (b'a\nb', b'\nc\n', b'd\n', b'e\n'):
+                consumed.append(chunk)
+                yield chunk
+
+        self.assertEqual(b''.join(head_chunks(chunks(), 2, True)), b'a\nb\n')
+        self.assertEqual(len(consumed), 2)
+        self.assertEqual(b''.join(head_chunks([b'abc', b'def'], 4, False)), b'abcd')
+        self.assertEqual(list(head_chunks(chunks(), 0, True)), [])
+
+    def test_head_files(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            first = os.path.join(tmp, 'first')
+            second = os.path.join(tmp, 'second')
+            with open(first, 'w') as f:
+                f.write(''.join(f'{i}\n' for i in range(20)))
+            with open(second, 'w') as f:
+                f.write('x\ny')
+            out, _, code = self.execute_command(f'head -n 2 {first}')
+            self.assertEqual((out, code), ('0\n1\n', 0))
+            out, _, _ = self.execute_command(f'head -2 {first} {second}')
+            self.assertEqual(out, f'==> {first} <==\n0\n1\n\n==> {second} <==\nx\ny')
+            out, err, code = self.execute_command(f'head {first} missing.txt')
+            self.assertIn('9\n', out)
+            self.assertIn('missing.txt', err)
+            self.assertEqual(code, 1)
+
+    def test_head_stops_producers(self):
+        self.assertEqual(self.execute_command('yes | head -n 3'), ('y\ny\ny\n', '', 0))
+        self.assertEqual(self.execute_command('seq 100000000 | cat | head -c 4'), ('1\n2\n', '', 0))
+        self.assertEqual(self.execute_command('echo a b | head -c 2'), ('a ', '', 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import subprocess
+import tempfile
+import unittest
+from interpreter import Interpreter, main
+from unittest.mock import patch
+from io import StringIO
+
+INTERPRETER = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src', 'interpreter.py'))
+
+
+class TestScriptMode(unittest.TestCase):
+    def run_script(self, lines, fail_fast=False):
+        with patch('sys.stdout', new=StringIO()) as fake_out, \
+             patch('sys.stderr', new=StringIO()) as fake_err:
+            code = Interpreter().run_script(lines, fail_fast)
+            return fake_out.getvalue(), fake_err.getvalue(), code
+
+    def test_exit_status_of_last_command(self):
+        out, _, code = self.run_script(['echo a\n', 'false\n', 'echo b\n'])
+        self.assertEqual(out, 'a\nb\n')
+        self.assertEqual(code, 0)
+        _, _, code = self.run_script(['echo a', 'false'])
+        self.assertEqual(code, 1)
+
+    def test_fail_fast(self):
+        out, _, code = self.run_script(['echo a', 'false', 'echo b'], fail_fast=True)
+        self.assertEqual(out, 'a\n')
+        self.assertEqual(code, 1)
+
+    def test_errors_and_exit(self):
+        out, err, code = self.run_script(['X=1', 'echo "$(', 'echo $X', 'exit', 'echo never'])
+        self.assertEqual(out, '1\n')
+        self.assertIn('Error: Unclosed command substitution', err)
+        self.assertEqual(code, 0)
+
+    def test_command_option(self):
+        with patch('sys.stdout', new=StringIO()) as fake_out:
+            code = main(['-c', 'A=x\necho $A | wc -c'])
+        self.assertEqual(fake_out.getvalue(), '2\n')
+        self.assertEqual(code, 0)
+
+    def test_script_file_and_stdin(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.sh', delete=False) as f:
+            f.write(''.join(f'echo line{i}\n' for i in range(1000)))
+            f.write('false\n')
+        try:
+            proc = subprocess.run([sys.executable, INTERPRETER, f.name],
+                                  capture_output=True, text=True)
+            self.assertEqual(proc.stdout.splitlines()[-1], 'line999')
+            self.assertEqual(proc.returncode, 1)
+            with open(f.name) as script:
+                proc = subprocess.run([sys.executable, INTERPRETER, '-e'], stdin=script,
+                                      capture_output=True, text=True)
+            self.assertEqual(len(proc.stdout.splitlines()), 1000)
+            self.assertEqual(proc.returncode, 1)
+        finally:
+            os.unlink(f.name)
+
+    def test_encoding_options(self):
+        proc = subprocess.run([sys.executable, INTERPRETER, '--encoding', 'latin-1', '-c',
+                               "echo $(printf '\\351')"], capture_output=True)
+        self.assertEqual(proc.stdout, b'\xe9\n')
+        with patch('sys.stderr', new=StringIO()):
+            self.assertEqual(main(['--encoding', 'no-such-codec', '-c', 'echo']), 2)
+            self.assertEqual(main(['--errors', 'no-such-policy', '-c', 'echo']), 2)
+
+    def test_missing_script(self):
+        with patch('sys.stderr', new=StringIO()) as fake_err:
+            self.assertEqual(main(['/nonexistent/script.sh']), 127)
+        self.assertIn('No such file', fake_err.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
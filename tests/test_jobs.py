@@ -0,0 +1,88 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import unittest
+from command_parser import CommandParser, parse_tree
+from process_manager import ProcessManager
+from environment_manager import EnvironmentManager
+from unittest.mock import patch
+from io import StringIO
+
+
+class TestJobs(unittest.TestCase):
+    def setUp(self):
+        self.env = EnvironmentManager()
+        self.process_manager = ProcessManager(self.env)
+        self.parser = CommandParser(self.env, self.process_manager)
+        self.jobs = self.process_manager.jobs
+
+    def execute_command(self, command_line):
+        command = self.parser.parse(command_line)
+        with patch('sys.stdout', new=StringIO()) as fake_out, \
+             patch('sys.stderr', new=StringIO()) as fake_err:
+            exit_code = self.process_manager.execute(command)
+            return fake_out.getvalue(), fake_err.getvalue(), exit_code
+
+    def test_parse_background(self):
+        self.assertTrue(parse_tree('sleep 1 | wc &').background)
+        self.assertFalse(parse_tree('echo "&"').background)
+        with self.assertRaises(ValueError):
+            parse_tree('sleep 1 & echo')
+
+    def test_background_job_does_not_block(self):
+        _, err, code = self.execute_command('sleep 2 &')
+        self.assertEqual(code, 0)
+        self.assertRegex(err, r'^\[1\] \d+\n$')
+        self.assertEqual(self.jobs.get().status, 'Running')
+        output, _, _ = self.execute_command('jobs')
+        self.assertEqual(output, '[1]  Running   sleep 2 &\n')
+        _, _, code = self.execute_command('wait %1')
+        self.assertEqual(code, 0)
+        self.assertEqual(self.jobs.jobs(), [])
+
+    def test_background_job_does_not_read_shell_input(self):
+        read_fd, write_fd = os.pipe()
+        saved = os.dup(0)
+        os.dup2(read_fd, 0)
+        try:
+            self.execute_command('tr a b &')
+            job = self.jobs.jobs()[0]
+            finished = job.done.wait(10)
+        finally:
+            os.dup2(saved, 0)
+            os.close(saved)
+            os.close(read_fd)
+            os.close(write_fd)
+        self.assertTrue(finished)
+        self.assertEqual(job.wait(), 0)
+
+    def test_exit_status_per_job(self):
+        with patch('sys.stdout', new=StringIO()) as fake_out, \
+             patch('sys.stderr', new=StringIO()):
+            self.process_manager.execute(self.parser.parse('echo a | grep b &'))
+            self.process_manager.execute(self.parser.parse('echo a | grep a &'))
+            first, second = self.jobs.jobs()
+            self.assertEqual(first.wait(), 1)
+            self.assertEqual(second.wait(), 0)
+        self.assertEqual(fake_out.getvalue(), 'a\n')
+        output, _, _ = self.execute_command('jobs')
+        self.assertEqual(output, '[1]  Exit 1    echo a | grep b &\n[2]  Done      echo a | grep a &\n')
+        self.assertEqual(self.jobs.jobs(), [])
+
+    def test_fg_and_wait(self):
+        self.execute_command('sh -c "sleep 0.2; exit 3" &')
+        output, _, code = self.execute_command('fg')
+        self.assertEqual(output, 'sh -c sleep 0.2; exit 3\n')
+        self.assertEqual(code, 3)
+        _, err, code = self.execute_command('fg')
+        self.assertEqual((err, code), ('fg: no current job\n', 1))
+        _, err, code = self.execute_command('wait 7')
+        self.assertEqual(code, 127)
+        self.execute_command('sleep 0.1 &')
+        self.assertEqual(self.execute_command('wait')[2], 0)
+        self.assertEqual(self.jobs.reap(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import tempfile
+import unittest
+from unittest.mock import patch
+from builtin_registry import BUILTINS
+from command import Command, CommandType, Pipeline, StageFlag
+from command_parser import CommandParser, parse_tree
+from process_manager import ProcessManager
+from environment_manager import EnvironmentManager
+from syntax_tree import AssignmentNode, CommandSub, Literal, PipelineNode, Var
+
+
+class TestParser(unittest.TestCase):
+    def setUp(self):
+        self.env = EnvironmentManager()
+        self.process_manager = ProcessManager(self.env)
+        self.parser = CommandParser(self.env, self.process_manager)
+
+    def test_tree_keeps_references_unexpanded(self):
+        tree = parse_tree('echo "a $X" $(pwd) | wc')
+        self.assertIsInstance(tree, PipelineNode)
+        echo, wc = tree.commands
+        self.assertEqual(echo.words[1].parts, (Literal('a '), Var('X')))
+        self.assertEqual(echo.words[2].parts, (CommandSub('pwd'),))
+        self.assertEqual(len(wc.words), 1)
+
+    def test_parse_cache_hit(self):
+        parse_tree.cache_clear()
+        first = parse_tree('echo $NAME')
+        second = parse_tree('echo $NAME')
+        self.assertIs(first, second)
+        self.assertEqual(parse_tree.cache_info().hits, 1)
+        hash(first)
+
+    def test_late_binding_expansion(self):
+        tree = self.parser.parse_tree('echo $NAME')
+        self.env.set_var('NAME', 'first')
+        self.assertEqual(self.parser.expand(tree).args, ('first',))
+        self.env.set_var('NAME', 'second')
+        self.assertEqual(self.parser.expand(tree).args, ('second',))
+
+    def test_quoting(self):
+        self.env.set_var('X', 'value')
+        command = self.parser.parse('echo \'$X\' "$X" \\$X "a\\"b"')
+        self.assertEqual(command.args, ('$X', 'value', '$X', 'a"b'))
+
+    def test_pipe_inside_substitution(self):
+        command = self.parser.parse('echo $(echo a b | wc)')
+        self.assertIsInstance(command, Command)
+        self.assertEqual(command.args, ('1 2 4',))
+
+    def test_pipeline_stages(self):
+        pipeline = self.parser.parse('echo a | tr a b < in | wc -c > out')
+        self.assertIsInstance(pipeline, Pipeline)
+        self.assertEqual([c.name for c in pipeline.commands], ['echo', 'tr', 'wc'])
+        self.assertEqual(pipeline.flags, (StageFlag.BUILTIN, StageFlag(0),
+                                          StageFlag.BUILTIN | StageFlag.STDIN | StageFlag.TERMINAL))
+        self.assertEqual(str(pipeline), 'echo a | tr a b 0<in | wc -c 1>out')
+        self.assertEqual(pipeline, self.parser.parse('echo a | tr a b < in | wc -c > out'))
+        self.assertEqual(len({pipeline, self.parser.parse('echo a | tr a b < in | wc -c > out')}), 1)
+        self.assertTrue(self.parser.parse('echo a &').background)
+        with self.assertRaises(AttributeError):
+            pipeline.background = True
+        with self.assertRaises(AttributeError):
+            pipeline.commands[0].name = 'cat'
+
+    def test_long_and_empty_words(self):
+        long_arg = 'x' * 100000
+        command = self.parser.parse(f'echo {long_arg} "" "a{long_arg}"')
+        self.assertEqual(command.args, (long_arg, '', 'a' + long_arg))
+        tree = parse_tree('echo a""b $X\'\'')
+        self.assertEqual(tree.commands[0].words[1].parts, (Literal('ab'),))
+        self.assertEqual(tree.commands[0].words[2].parts, (Var('X'),))
+
+    def test_assignment(self):
+        self.assertEqual(parse_tree('A="x y"'), AssignmentNode('A', parse_tree('echo "x y"').commands[0].words[1:]))
+        command = self.parser.parse('echo a=b')
+        self.assertEqual(command.type, CommandType.BUILTIN)
+        with self.assertRaises(ValueError):
+            self.parser.parse('1A=value')
+
+
+class TestCommandSubstitution(unittest.TestCase):
+    def setUp(self):
+        self.env = EnvironmentManager()
+        self.process_manager = ProcessManager(self.env)
+
+    def parser(self, **kwargs):
+        return CommandParser(self.env, self.process_manager, **kwargs)
+
+    def test_pure_substitutions_are_memoized(self):
+        Echo = BUILTINS.get('echo')
+        with patch.object(Echo, 'run', autospec=True, side_effect=Echo.run) as run:
+            command = self.parser().parse('echo $(echo a) $(echo a) $(echo b)')
+        self.assertEqual(command.args, ('a', 'a', 'b'))
+        self.assertEqual(run.call_count, 2)
+        with patch.object(Echo, 'run', autospec=True, side_effect=Echo.run) as run:
+            self.parser(memoize_substitutions=False).parse('echo $(echo a) $(echo a)')
+        self.assertEqual(run.call_count, 2)
+
+    def test_impure_substitutions_run_every_time(self):
+        command = self.parser().parse('echo $(cat /dev/null | wc -l) $(printf x) $(printf x)')
+        self.assertEqual(command.args, ('0', 'x', 'x'))
+
+    def test_redirecting_substitutions_run_every_time(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'out')
+            self.parser().parse(f'echo $(echo x >> {path}) $(echo x >> {path})')
+            with open(path) as f:
+                self.assertEqual(f.read(), 'x\nx\n')
+
+    def test_output_limit(self):
+        parser = self.parser(substitution_limit=10)
+        self.assertEqual(parser.parse('echo $(echo 123456789)').args, ('123456789',))
+        with self.assertRaises(ValueError):
+            parser.parse('echo $(echo 1234567890)')
+        with self.assertRaises(ValueError):
+            parser.parse('echo $(seq 100000 | grep 1)')
+
+    def test_concurrent_substitutions_keep_order(self):
+        # The first substitution only prints once the last one has run, so
+        # it finishes last and succeeds only if they run side by side.
+        parser = self.parser(substitution_jobs=4)
+        with tempfile.TemporaryDirectory() as tmp:
+            flag = os.path.join(tmp, 'flag')
+            command = parser.parse(
+                f"echo $(sh -c 'i=0; until [ -e {flag} ] || [ $i -ge 1000 ]; do sleep 0.01; i=$((i+1)); done;"
+                f" [ -e {flag} ] && echo a') $(echo $(sh -c 'sleep 0.1; echo b')) $(sh -c 'touch {flag}; echo c')")
+        self.assertEqual(command.args, ('a', 'b', 'c'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,10 +2,14 @@ import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
 
+import io
+import signal
 import unittest
 import tempfile
 from command_parser import CommandParser
 from process_manager import ProcessManager
+from pipeline_executor import Segment, pipeline_status
+from command import StageFlag
 from environment_manager import EnvironmentManager
 from unittest.mock import patch
 from io import StringIO
@@ -49,6 +53,116 @@ class TestPipeline(unittest.TestCase):
             stdout, _, _ = self.execute_command(f'cat {f.name} | grep line2')
             self.assertEqual(stdout, "line2")
 
+    def test_stages_run_concurrently(self):
+        stdout, _, _ = self.execute_command('yes | head -n 2')
+        self.assertEqual(stdout, "y\ny")
+
+    def test_external_chain_into_builtin(self):
+        stdout, _, code = self.execute_command('seq 1 100000 | grep 99999 | wc')
+        self.assertEqual(stdout, "1 1 6")
+        self.assertEqual(code, 0)
+
+    def test_capture_whole_pipeline(self):
+        command = self.parser.parse('echo "a b c" | wc')
+        stdout, stderr, code = self.process_manager.execute_capture(command)
+        self.assertEqual(stdout.strip(), "1 3 6")
+        self.assertEqual(code, 0)
+
+    def test_capture_pipeline_with_input(self):
+        capture = self.process_manager.execute_capture
+        self.assertEqual(capture(self.parser.parse('grep x | wc -l'), 'x\ny\nx\n'), ("2\n", "", 0))
+        self.assertEqual(capture(self.parser.parse('tr a b | cat'), 'aaa\n'), ("bbb\n", "", 0))
+        self.assertEqual(capture(self.parser.parse('cat | tr a b | grep -c b'), b'a\nc\na\n'),
+                         ("2\n", "", 0))
+        data = 'line\n' * 100000
+        self.assertEqual(capture(self.parser.parse('head -n 1 | cat'), data), ("line\n", "", 0))
+
+    def test_binary_data_path(self):
+        data = bytes(range(256)) * 1000
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            f.write(data)
+        try:
+            out = io.TextIOWrapper(io.BytesIO(), encoding='utf-8')
+            with patch('sys.stdout', new=out):
+                code = self.process_manager.execute(self.parser.parse(f'cat {f.name} | tr a a'))
+            self.assertEqual(out.buffer.getvalue(), data)
+            self.assertEqual(code, 0)
+
+            manager = ProcessManager(self.env, encoding='latin-1', errors='strict')
+            parser = CommandParser(self.env, manager)
+            stdout, _, _ = manager.execute_capture(parser.parse(f'cat {f.name} | tr a a'))
+            self.assertEqual(stdout.encode('latin-1'), data)
+            stdout, _, _ = manager.execute_capture(parser.parse('tr a a'), data.decode('latin-1'))
+            self.assertEqual(stdout.encode('latin-1'), data)
+        finally:
+            os.unlink(f.name)
+
+    def test_terminal_stage_inherits_stdout_fd(self):
+        with tempfile.TemporaryFile('w+') as out, tempfile.TemporaryFile('w+') as err:
+            stages = self.parser.parse('seq 3 | grep -v 2 | tr 1 x')
+            pipeline = self.process_manager.pipeline_executor.start(stages, err, out)
+            self.assertIsNone(pipeline.stdout_fd)
+            self.assertEqual(pipeline.wait(), 0)
+
+            self.process_manager.autoflush = False
+            with patch('sys.stdout', new=out), patch('sys.stderr', new=err):
+                self.process_manager.execute(self.parser.parse('echo first'))
+                self.process_manager.execute(self.parser.parse('ls /nonexistent_dir_12345'))
+                self.process_manager.execute(self.parser.parse('echo a | tr a b'))
+            out.seek(0)
+            err.seek(0)
+            self.assertEqual(out.read(), 'x\n3\nfirst\nb\n')
+            self.assertIn('nonexistent_dir_12345', err.read())
+
+    def test_plan_fuses_streaming_builtins(self):
+        executor = self.process_manager.pipeline_executor
+        plan = executor.plan(self.parser.parse('cat f | grep a | tr a b | grep b | wc -l'))
+        self.assertEqual([[c.name for c in s.commands] for s in plan],
+                         [['cat', 'grep'], ['tr'], ['grep', 'wc']])
+        self.assertTrue(plan[0].fused)
+        self.assertEqual(plan[0].flags, StageFlag.BUILTIN)
+        self.assertEqual(plan[2].flags, StageFlag.BUILTIN | StageFlag.STDIN | StageFlag.TERMINAL)
+
+        plan = executor.plan(self.parser.parse('cat f | echo a | wc f | grep -l a g | wc > out'))
+        self.assertEqual([len(s.commands) for s in plan], [1, 1, 1, 1, 1])
+
+    def test_fused_output_matches_threaded(self):
+        with tempfile.NamedTemporaryFile('w+') as f:
+            f.write(''.join(f'line {i}\n' for i in range(100000)) + 'tail')
+            f.flush()
+            for line in (f'cat {f.name} | grep -n 99 | wc',
+                         f'cat {f.name} | grep -v 1 | grep -c 2',
+                         f'cat {f.name} | grep -m 3 -A 1 7 | cat',
+                         f'cat {f.name} - | grep tail'):
+                fused = self.execute_command(line)
+                with patch.object(self.process_manager.pipeline_executor, 'plan',
+                                  lambda p: [Segment((c,), fl) for c, fl in zip(p.commands, p.flags)]):
+                    threaded = self.execute_command(line)
+                self.assertEqual(fused, threaded, line)
+
+    def test_fused_exit_codes(self):
+        self.assertEqual(self.execute_command('echo a | grep b | wc -l'), ("0", "", 1))
+        stdout, stderr, code = self.execute_command('cat missing.txt | grep a | wc -l')
+        self.assertEqual(stdout, "0")
+        self.assertIn("missing.txt", stderr)
+        self.assertEqual(code, 1)
+        self.assertEqual(self.execute_command('seq 3 | cat | grep -c 2'), ("1", "", 0))
+
+    def test_early_exit_stops_producers(self):
+        self.assertEqual(self.execute_command('seq 100000000 | grep -m 1 5'), ("5", "", 0))
+        self.assertEqual(self.execute_command('seq 100000000 | tr 1 2 | head -n 1'), ("2", "", 0))
+        self.assertEqual(pipeline_status([-signal.SIGPIPE, 0]), 0)
+        self.assertEqual(pipeline_status([0, -signal.SIGPIPE]), -signal.SIGPIPE)
+        self.assertEqual(pipeline_status([2, -signal.SIGPIPE, 0]), 2)
+
+    def test_surrogateescape_policy(self):
+        manager = ProcessManager(self.env, errors='surrogateescape')
+        parser = CommandParser(self.env, manager)
+        command = parser.parse("echo $(printf 'a\\377b')")
+        self.assertEqual(command.args, ('a\udcffb',))
+        stdout, _, _ = manager.execute_capture(command)
+        self.assertEqual(manager.encode(stdout), b'a\xffb\n')
+
 
 if __name__ == '__main__':
     unittest.main()
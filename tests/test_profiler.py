@@ -0,0 +1,116 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import json
+import tempfile
+import unittest
+from interpreter import Interpreter, main
+from profiler import CommandStats, CountingReader, Profiler, StageStats
+from unittest.mock import patch
+from io import BytesIO, StringIO
+
+
+class TestProfiler(unittest.TestCase):
+    def run_script(self, lines, interpreter=None):
+        interpreter = interpreter or Interpreter()
+        with patch('sys.stdout', new=StringIO()) as fake_out, \
+             patch('sys.stderr', new=StringIO()) as fake_err:
+            code = interpreter.run_script(lines)
+            return fake_out.getvalue(), fake_err.getvalue(), code
+
+    def test_profile_prefix_reports_stages(self):
+        out, err, code = self.run_script(['profile echo hello | tr a b | wc -c'])
+        self.assertEqual(out, '6\n')
+        self.assertEqual(code, 0)
+        lines = err.splitlines()
+        self.assertIn('parse', lines[0])
+        self.assertIn('out 2 B', lines[0])
+        self.assertIn('1 echo (builtin)', lines[1])
+        self.assertIn('out 6 B', lines[1])
+        self.assertIn('3 wc (builtin)', lines[3])
+        self.assertIn('in 6 B', lines[3])
+
+    def test_fused_stages_report_once(self):
+        out, err, _ = self.run_script(['profile echo hello | wc -c'])
+        self.assertEqual(out, '6\n')
+        lines = err.splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertIn('1 echo|wc (fused)', lines[1])
+        self.assertIn('out 2 B', lines[1])
+
+    def test_external_stage_and_substitution(self):
+        interpreter = Interpreter()
+        out, err, _ = self.run_script(['profile echo $(echo a) | grep a | tr a b'], interpreter)
+        self.assertEqual(out, 'b\n')
+        self.assertIn('2 tr (external)', err)
+        stats = interpreter.process_manager.profiler
+        self.assertEqual(stats.commands, 1)
+        self.assertGreater(stats.samples['substitution_ms'][0], 0)
+
+    def test_disabled_by_default(self):
+        interpreter = Interpreter()
+        out, err, _ = self.run_script(['echo a | wc -c'], interpreter)
+        self.assertEqual((out, err), ('2\n', ''))
+        self.assertIsNone(interpreter.process_manager.profiler)
+        self.assertIsNone(interpreter.process_manager.stats)
+
+    def test_stats_builtin(self):
+        _, err, code = self.run_script(['stats'])
+        self.assertEqual(code, 1)
+        self.assertIn('no profiled commands', err)
+        out, _, _ = self.run_script(['profile echo a', 'profile echo bb', 'stats'])
+        self.assertIn('commands: 2', out)
+        self.assertIn('wall_ms: n=2', out)
+        out, _, _ = self.run_script(['profile echo a', 'stats -r', 'profile echo b', 'stats'])
+        self.assertIn('commands: 1', out)
+
+    def test_trace_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'trace.jsonl')
+            with patch('sys.stdout', new=StringIO()) as fake_out, \
+                 patch('sys.stderr', new=StringIO()) as fake_err:
+                code = main(['--trace', path, '-c', 'echo a\nX=1\nseq 3 | wc -l'])
+            self.assertEqual(code, 0)
+            self.assertEqual(fake_out.getvalue(), 'a\n3\n')
+            self.assertEqual(fake_err.getvalue(), '')
+            with open(path) as f:
+                records = [json.loads(line) for line in f]
+        self.assertEqual([r['command'] for r in records], ['echo a', 'X=1', 'seq 3 | wc -l'])
+        self.assertEqual([s['name'] for s in records[2]['stages']], ['seq', 'wc'])
+        self.assertEqual(records[2]['bytes_out'], 2)
+        self.assertIsNotNone(records[2]['stages'][0]['cpu_ms'])
+
+    def test_counting_reader_without_buffered_methods(self):
+        class Plain:
+            def __init__(self, data):
+                self.data = BytesIO(data)
+
+            def read(self, size=-1):
+                return self.data.read(size)
+
+        stats = StageStats('x', 'builtin')
+        reader = CountingReader(Plain(b'abcdef'), stats)
+        self.assertEqual(reader.read1(2), b'ab')
+        buffer = bytearray(3)
+        self.assertEqual(reader.readinto(buffer), 3)
+        self.assertEqual(bytes(buffer), b'cde')
+        self.assertEqual(stats.bytes_in, 5)
+
+    def test_summary_histogram(self):
+        profiler = Profiler()
+        for wall in (0.5, 3, 3, 100):
+            stats = CommandStats('x')
+            stats.wall_ms = wall
+            stats.stages.append(StageStats('x', 'builtin'))
+            profiler.record(stats)
+        summary = profiler.summary().splitlines()
+        start = summary.index(next(line for line in summary if line.startswith('wall_ms')))
+        self.assertIn('p50=3.000', summary[start])
+        self.assertIn('max=100.000', summary[start])
+        self.assertEqual([line.split()[0] for line in summary[start + 1:start + 4]],
+                         ['<1', '<4', '<128'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import asyncio
+import tempfile
+import unittest
+from async_process_manager import AsyncProcessManager
+from command import Redirection
+from command_parser import CommandParser, parse_tree
+from process_manager import ProcessManager
+from environment_manager import EnvironmentManager
+from syntax_tree import Literal, Redirect, Word
+from unittest.mock import patch
+from io import StringIO
+
+
+class TestRedirection(unittest.TestCase):
+    def setUp(self):
+        self.env = EnvironmentManager()
+        self.process_manager = ProcessManager(self.env)
+        self.parser = CommandParser(self.env, self.process_manager)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.env.set_var('D', self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.tmp.name, name)
+
+    def read(self, name):
+        with open(self.path(name), 'rb') as f:
+            return f.read()
+
+    def execute_command(self, command_line):
+        command = self.parser.parse(command_line)
+        with patch('sys.stdout', new=StringIO()) as fake_out, \
+             patch('sys.stderr', new=StringIO()) as fake_err:
+            exit_code = self.process_manager.execute(command)
+            return fake_out.getvalue(), fake_err.getvalue(), exit_code
+
+    def test_parse(self):
+        tree = parse_tree('sort < in 2>&1 >> "o u t" | wc')
+        self.assertEqual(tree.commands[0].redirects, (
+            Redirect(0, '<', Word((Literal('in'),))),
+            Redirect(2, '>&', Word((Literal('1'),))),
+            Redirect(1, '>>', Word((Literal('o u t'),)))))
+        self.assertEqual(tree.commands[1].redirects, ())
+        command = self.parser.parse('echo a 2> $D/err')
+        self.assertEqual(command.args, ('a',))
+        self.assertEqual(command.redirects, (Redirection(2, '>', self.path('err')),))
+        for line in ('echo >', 'echo > | wc', 'echo > > f'):
+            with self.assertRaises(ValueError):
+                parse_tree(line)
+
+    def test_builtin_redirections(self):
+        self.assertEqual(self.execute_command('echo hello > $D/out'), ('', '', 0))
+        self.execute_command('echo world >> $D/out')
+        self.assertEqual(self.read('out'), b'hello\nworld\n')
+        output, _, _ = self.execute_command('wc < $D/out')
+        self.assertEqual(output, '2 2 12\n')
+        _, _, code = self.execute_command('cat $D/missing 2> $D/err')
+        self.assertEqual(code, 1)
+        self.assertIn(b'missing', self.read('err'))
+        output, _, _ = self.execute_command('cat $D/missing 2>&1 | wc -l')
+        self.assertEqual(output, '1\n')
+        _, err, code = self.execute_command('wc < $D/missing')
+        self.assertEqual(code, 1)
+        self.assertIn('No such file or directory', err)
+
+    def test_external_redirections(self):
+        self.execute_command('seq 3 > $D/out')
+        self.assertEqual(self.read('out'), b'1\n2\n3\n')
+        output, _, _ = self.execute_command('tr 1 x < $D/out | grep x')
+        self.assertEqual(output, 'x\n')
+        self.execute_command('ls $D/missing > $D/both 2>&1')
+        self.assertIn(b'missing', self.read('both'))
+        output, _, _ = self.execute_command('echo a | tr a b > $D/piped')
+        self.assertEqual((output, self.read('piped')), ('', b'b\n'))
+        _, err, code = self.execute_command('tr a b < $D/missing | wc -l')
+        self.assertIn('missing: No such file or directory', err)
+
+    def test_capture_and_async(self):
+        stdout, _, code = self.process_manager.execute_capture(
+            self.parser.parse('ls $D/missing 2>&1'))
+        self.assertIn('missing', stdout)
+        stdout, _, _ = self.process_manager.execute_capture(
+            self.parser.parse('tr a b > $D/captured'), 'aaa')
+        self.assertEqual((stdout, self.read('captured')), ('', b'bbb'))
+        manager = AsyncProcessManager(self.env, self.process_manager)
+        stdout, _, _ = asyncio.run(manager.execute_capture(self.parser.parse('ls $D/missing 2>&1')))
+        self.assertIn('missing', stdout)
+
+    def test_duplication_codec_and_captured_stderr(self):
+        manager = ProcessManager(self.env, encoding='latin-1', errors='strict')
+        parser = CommandParser(self.env, manager)
+        stdout, stderr, code = manager.execute_capture(parser.parse('echo \xe9 1>&2'))
+        self.assertEqual((stdout, stderr, code), ('', '\xe9\n', 0))
+        command = self.parser.parse('sh -c "echo a" 1>&2')
+        self.assertEqual(self.process_manager.execute_capture(command), ('', 'a\n', 0))
+        stdout, stderr, code = self.process_manager.execute_capture(command, 'x')
+        self.assertEqual((stdout, stderr, code), ('', '1>&2: unsupported redirection', 1))
+        manager = AsyncProcessManager(self.env, self.process_manager)
+        stdout, stderr, code = asyncio.run(manager.execute_capture(command))
+        self.assertEqual((stdout, stderr, code), ('', '1>&2: unsupported redirection\n', 1))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import io
+import unittest
+import tempfile
+from command_parser import CommandParser
+from process_manager import ProcessManager
+from environment_manager import EnvironmentManager
+from unittest.mock import patch
+from io import StringIO
+from builtin_commands import tail
+from builtin_commands.tail import tail_chunks, tail_offset
+
+
+class TestTail(unittest.TestCase):
+    def setUp(self):
+        self.env = EnvironmentManager()
+        self.process_manager = ProcessManager(self.env)
+        self.parser = CommandParser(self.env, self.process_manager)
+
+    def execute_command(self, command_line):
+        command = self.parser.parse(command_line)
+        with patch('sys.stdout', new=StringIO()) as fake_out, \
+             patch('sys.stderr', new=StringIO()) as fake_err:
+            exit_code = self.process_manager.execute(command)
+            return fake_out.getvalue(), fake_err.getvalue(), exit_code
+
+    def test_tail_offset_and_chunks_agree(self):
+        samples = [b'', b'a', b'a\n', b'a\n\n', b'a\nb\nc', b'a\nb\nc\n', b'\n\n\n',
+                   b''.join(b'line %d\n' % i for i in range(1000))]
+        with patch.object(tail, 'BLOCK_SIZE', 7):
+            for data in samples:
+                for count in (0, 1, 2, 5, 2000):
+                    lines = data.splitlines(keepends=True)
+                    expected = b''.join(lines[-count:]) if count else b''
+                    self.assertEqual(data[tail_offset(io.BytesIO(data), count, True):], expected)
+                    pieces = [data[i:i + 3] for i in range(0, len(data), 3)]
+                    self.assertEqual(tail_chunks(pieces, count, True), expected)
+                    self.assertEqual(tail_chunks(pieces, count, False),
+                                     data[-count:] if count else b'')
+
+    def test_tail_file_reads_from_end(self):
+        with tempfile.NamedTemporaryFile('w', delete=False) as f:
+            f.write(''.join(f'{i}\n' for i in range(100000)))
+        try:
+            reads = []
+            real_offset = tail.tail_offset
+
+            def offset(source, count, lines):
+                position = real_offset(source, count, lines)
+                reads.append(position)
+                return position
+
+            with patch.object(tail, 'tail_offset', offset):
+                out, _, code = self.execute_command(f'tail -n 2 {f.name}')
+            self.assertEqual((out, code), ('99998\n99999\n', 0))
+            self.assertEqual(reads, [os.path.getsize(f.name) - 12])
+            self.assertEqual(self.execute_command(f'tail -c 3 < {f.name}')[0], '99\n')
+        finally:
+            os.unlink(f.name)
+
+    def test_tail_pipes(self):
+        self.assertEqual(self.execute_command('seq 100000 | tail -n 2'), ('99999\n100000\n', '', 0))
+        self.assertEqual(self.execute_command('echo a b | tail -c 2'), ('b\n', '', 0))
+        _, err, code = self.execute_command('tail missing.txt')
+        self.assertIn('missing.txt', err)
+        self.assertEqual(code, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -9,7 +9,9 @@ from command_parser import CommandParser
 from process_manager import ProcessManager
 from environment_manager import EnvironmentManager
 from unittest.mock import patch
-from io import StringIO
+from io import BytesIO, StringIO
+from command import CommandFactory, CommandType
+from builtin_registry import CHUNK_SIZE
 
 class TestWc(unittest.TestCase):
     def setUp(self):
@@ -34,6 +36,49 @@ class TestWc(unittest.TestCase):
             self.assertEqual(code, 0)
         os.unlink(f.name)
 
+    def test_wc_word_across_chunk_boundary(self):
+        data = b'a' * (CHUNK_SIZE - 1) + b'bc def\n'
+        command = CommandFactory.create(CommandType.BUILTIN, 'wc', [])
+        stdout, stderr = BytesIO(), StringIO()
+        code = self.process_manager.execute_builtin_stream(
+            command, BytesIO(data), stdout, stderr)
+        self.assertEqual(stdout.getvalue(), f'1 2 {len(data)}\n'.encode())
+        self.assertEqual(code, 0)
+
+    def _write_temp(self, data):
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            f.write(data)
+        self.addCleanup(os.unlink, f.name)
+        return f.name
+
+    def test_wc_flags(self):
+        name = self._write_temp(b'one two\nthree\n')
+        self.assertEqual(self.execute_command(f'wc -l {name}'), (f'2 {name}', 0))
+        self.assertEqual(self.execute_command(f'wc -wc {name}'), (f'3 14 {name}', 0))
+
+    def test_wc_multiple_files_total(self):
+        first = self._write_temp(b'a b\n')
+        second = self._write_temp(b'c\nd e f\n')
+        output, code = self.execute_command(f'wc {first} {second}')
+        self.assertEqual(output.split('\n'), [
+            f'1 2 4 {first}', f'2 4 8 {second}', '3 6 12 total'])
+        self.assertEqual(code, 0)
+
+    def test_wc_mmap_windows_split_words(self):
+        data = b'word ' * 1000 + b'x' * 3000 + b' \n'
+        name = self._write_temp(data)
+        with patch('builtin_commands.wc.WINDOW_SIZE', 7):
+            output, _ = self.execute_command(f'wc {name}')
+        self.assertEqual(output, f'1 1001 {len(data)} {name}')
+
+    def test_wc_parallel_ranges(self):
+        data = b'alpha beta\ngamma\n' * 5000
+        name = self._write_temp(data)
+        with patch('builtin_commands.wc.PARALLEL_THRESHOLD', 1024):
+            output, code = self.execute_command(f'wc -j 3 {name}')
+        self.assertEqual(output, f'10000 15000 {len(data)} {name}')
+        self.assertEqual(code, 0)
+
 
 if __name__ == '__main__':
     unittest.main()